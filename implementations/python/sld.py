@@ -22,7 +22,10 @@ Breaking changes from v1.0:
 - Added MLD format support (records separated by newlines)
 """
 
-from typing import Any, Dict, List, Union
+import io
+import re
+from functools import lru_cache
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Tuple, Union
 
 
 # Constants
@@ -33,10 +36,26 @@ PROPERTY_MARKER = "["
 ARRAY_MARKER = "{"
 ESCAPE_CHAR = "^"
 
+# Characters escaped on output, in replacement order: the escape character
+# goes first so the carets added for the others are not doubled
+ESCAPED_CHARS = (ESCAPE_CHAR, FIELD_SEPARATOR, RECORD_SEPARATOR_SLD, PROPERTY_MARKER, ARRAY_MARKER)
+_ESCAPE_TABLE = tuple((ch, ESCAPE_CHAR + ch) for ch in ESCAPED_CHARS)
+_NEEDS_ESCAPE = re.compile("[" + re.escape("".join(ESCAPED_CHARS)) + "]")
+# Escape pairs that decode to something other than their second character
+_UNESCAPE_CODES = {"1": "True", "0": "False"}
+
+# Number of distinct key layouts whose compiled record encoders are kept
+ENCODER_CACHE_SIZE = 256
+
+# Writers hand output to their sink once this many characters are buffered
+DEFAULT_FLUSH_SIZE = 64 * 1024
+
 
 def escape_value(text: str) -> str:
     """Escape special SLD/MLD characters in a string.
 
+    Text with nothing to escape is returned as-is, without a copy.
+
     Args:
         text: The text to escape
 
@@ -47,12 +66,11 @@ def escape_value(text: str) -> str:
         return ""
 
     str_text = str(text)
-    return (str_text
-            .replace(ESCAPE_CHAR, ESCAPE_CHAR + ESCAPE_CHAR)
-            .replace(FIELD_SEPARATOR, ESCAPE_CHAR + FIELD_SEPARATOR)
-            .replace(RECORD_SEPARATOR_SLD, ESCAPE_CHAR + RECORD_SEPARATOR_SLD)
-            .replace(PROPERTY_MARKER, ESCAPE_CHAR + PROPERTY_MARKER)
-            .replace(ARRAY_MARKER, ESCAPE_CHAR + ARRAY_MARKER))
+    if _NEEDS_ESCAPE.search(str_text) is None:
+        return str_text
+    for char, escaped in _ESCAPE_TABLE:
+        str_text = str_text.replace(char, escaped)
+    return str_text
 
 
 def unescape_value(text: str) -> str:
@@ -64,29 +82,35 @@ def unescape_value(text: str) -> str:
     Returns:
         Unescaped original text
     """
+    if ESCAPE_CHAR not in text:
+        return text
+    if ("^^" not in text and "^1" not in text and "^0" not in text
+            and not text.endswith(ESCAPE_CHAR)):
+        # Every escape character precedes an ordinary character
+        return text.replace(ESCAPE_CHAR, "")
+
     result = []
     i = 0
-    while i < len(text):
-        if text[i] == ESCAPE_CHAR and i + 1 < len(text):
-            next_char = text[i + 1]
-            if next_char == '1':
-                result.append(True)
-                i += 2
-            elif next_char == '0':
-                result.append(False)
-                i += 2
-            else:
-                result.append(next_char)
-                i += 2
-        else:
-            result.append(text[i])
-            i += 1
-    return "".join(str(c) for c in result)
+    while True:
+        j = text.find(ESCAPE_CHAR, i)
+        if j < 0 or j + 1 >= len(text):
+            # No more escapes (a trailing escape character is kept)
+            result.append(text[i:])
+            break
+        result.append(text[i:j])
+        next_char = text[j + 1]
+        result.append(_UNESCAPE_CODES.get(next_char, next_char))
+        i = j + 2
+    return "".join(result)
 
 
 def split_unescaped(text: str, delimiter: str) -> List[str]:
     """Split text by delimiter, respecting escape sequences.
 
+    The text is split with str.split; only pieces that end in an odd run
+    of escape characters (i.e. whose delimiter was escaped) are glued back
+    together, so escape-free input never runs a Python-level character loop.
+
     Args:
         text: The text to split
         delimiter: The delimiter character
@@ -94,26 +118,25 @@ def split_unescaped(text: str, delimiter: str) -> List[str]:
     Returns:
         List of split parts
     """
-    parts = []
-    current = []
-    i = 0
-
-    while i < len(text):
-        if text[i] == ESCAPE_CHAR and i + 1 < len(text):
-            current.append(text[i:i+2])
-            i += 2
-        elif text[i] == delimiter:
-            parts.append("".join(current))
-            current = []
-            i += 1
+    if not text:
+        return []
+    parts = text.split(delimiter)
+    if ESCAPE_CHAR not in text:
+        return parts
+
+    merged = []
+    pending = None
+    for part in parts:
+        if pending is not None:
+            part = pending + delimiter + part
+            pending = None
+        if part.endswith(ESCAPE_CHAR) and (len(part) - len(part.rstrip(ESCAPE_CHAR))) % 2:
+            pending = part
         else:
-            current.append(text[i])
-            i += 1
-
-    if current or text.endswith(delimiter):
-        parts.append("".join(current))
-
-    return parts
+            merged.append(part)
+    if pending is not None:
+        merged.append(pending)
+    return merged
 
 
 def encode_sld(data: Union[List[Dict], Dict]) -> str:
@@ -166,38 +189,202 @@ def encode_mld(data: Union[List[Dict], Dict]) -> str:
 def _encode_record(record: Dict[str, Any]) -> str:
     """Encode a single record (dictionary) to SLD/MLD format.
 
+    Records sharing the same keys in the same order reuse one compiled
+    encoder (see _record_encoder), so keys are escaped once per layout
+    rather than once per record. Only all-str layouts are cached: the
+    cache compares keys by equality, which would let 1, 1.0 and True
+    share an encoder.
+
     Args:
         record: Dictionary to encode
 
     Returns:
         Encoded string for the record
     """
-    parts = []
+    keys = tuple(record)
+    if all(type(key) is str for key in keys):
+        return _record_encoder(keys)(record)
+    return FIELD_SEPARATOR.join(_encode_field(escape_value(str(key)), value)
+                                for key, value in record.items())
+
+
+@lru_cache(maxsize=ENCODER_CACHE_SIZE)
+def _record_encoder(keys: Tuple[str, ...]) -> Callable[[Dict[str, Any]], str]:
+    """Compile an encoder for records with exactly these keys, in this order.
 
-    for key, value in record.items():
+    Args:
+        keys: Record keys in iteration order
+
+    Returns:
+        Function encoding such a record
+    """
+    fields = []
+    for key in keys:
         escaped_key = escape_value(str(key))
+        prop = escaped_key + PROPERTY_MARKER
+        fields.append((key, escaped_key, prop, prop + "^1", prop + "^0", prop + "^_"))
+
+    def encode(record: Dict[str, Any]) -> str:
+        parts = []
+        for key, escaped_key, prop, true_field, false_field, null_field in fields:
+            value = record[key]
+            value_type = type(value)
+            if value_type is str:
+                parts.append(prop + escape_value(value))
+            elif value is None:
+                parts.append(null_field)
+            elif value_type is bool:
+                parts.append(true_field if value else false_field)
+            elif value_type is int or value_type is float:
+                parts.append(prop + escape_value(str(value)))
+            else:
+                parts.append(_encode_field(escaped_key, value))
+        return FIELD_SEPARATOR.join(parts)
+
+    return encode
+
+
+def _encode_field(escaped_key: str, value: Any) -> str:
+    """Encode one key/value pair of any type.
 
-        if isinstance(value, dict):
-            # Nested object - not fully implemented yet
-            nested = _encode_record(value)
-            parts.append(f"{escaped_key}{PROPERTY_MARKER}{nested}")
-        elif isinstance(value, list):
-            # Array using { marker
-            nested_items = [escape_value(str(item)) for item in value]
-            parts.append(f"{escaped_key}{ARRAY_MARKER}{','.join(nested_items)}")
-        elif isinstance(value, bool):
-            # Boolean as ^1 or ^0
-            bool_val = "^1" if value else "^0"
-            parts.append(f"{escaped_key}{PROPERTY_MARKER}{bool_val}")
-        elif value is None:
-            # Null value as ^_
-            parts.append(f"{escaped_key}{PROPERTY_MARKER}^_")
+    Args:
+        escaped_key: Key, already escaped
+        value: Value to encode
+
+    Returns:
+        Encoded field
+    """
+    if isinstance(value, dict):
+        # Nested object - not fully implemented yet
+        nested = _encode_record(value)
+        return f"{escaped_key}{PROPERTY_MARKER}{nested}"
+    elif isinstance(value, list):
+        # Array using { marker
+        nested_items = [escape_value(str(item)) for item in value]
+        return f"{escaped_key}{ARRAY_MARKER}{','.join(nested_items)}"
+    elif isinstance(value, bool):
+        # Boolean as ^1 or ^0
+        bool_val = "^1" if value else "^0"
+        return f"{escaped_key}{PROPERTY_MARKER}{bool_val}"
+    elif value is None:
+        # Null value as ^_
+        return f"{escaped_key}{PROPERTY_MARKER}^_"
+    else:
+        # Regular value
+        escaped_value = escape_value(str(value))
+        return f"{escaped_key}{PROPERTY_MARKER}{escaped_value}"
+
+
+class _RecordWriter:
+    """Buffered record writer shared by SLDWriter and MLDWriter.
+
+    Subclasses only set fmt: in "sld" every record is followed by the
+    record separator, in "mld" records are separated by newlines.
+    """
+
+    fmt = "sld"
+
+    def __init__(self, sink: IO, header: Optional[Dict[str, Any]] = None,
+                 flush_size: int = DEFAULT_FLUSH_SIZE, encoding: str = "utf-8"):
+        self.sink = sink
+        self.flush_size = flush_size
+        self.encoding = encoding
+        self.count = 0
+        self._binary = (isinstance(sink, (io.RawIOBase, io.BufferedIOBase))
+                        or "b" in getattr(sink, "mode", ""))
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._closed = False
+        self._started = False
+        if header:
+            self._emit(_encode_record(header))
+
+    def write(self, record: Dict[str, Any]) -> None:
+        """Encode one record and append it to the output."""
+        if self._closed:
+            raise ValueError("write to closed writer")
+        self._emit(_encode_record(record))
+        self.count += 1
+
+    def write_all(self, records: Iterable[Dict[str, Any]]) -> int:
+        """Write every record from an iterable or generator.
+
+        Returns:
+            Number of records written by this call
+        """
+        written = 0
+        for record in records:
+            self.write(record)
+            written += 1
+        return written
+
+    def flush(self) -> None:
+        """Hand buffered output to the sink."""
+        if not self._buffer:
+            return
+        chunk = "".join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self.sink.write(chunk.encode(self.encoding) if self._binary else chunk)
+
+    def close(self) -> None:
+        """Flush remaining output. The sink itself is left open."""
+        if self._closed:
+            return
+        if self.fmt == "sld" and not self._started:
+            # encode_sld([]) still emits the record terminator
+            self._append(RECORD_SEPARATOR_SLD)
+        self.flush()
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _emit(self, encoded: str) -> None:
+        if self.fmt == "sld":
+            self._append(encoded + RECORD_SEPARATOR_SLD)
+        elif self._started:
+            self._append(RECORD_SEPARATOR_MLD + encoded)
         else:
-            # Regular value
-            escaped_value = escape_value(str(value))
-            parts.append(f"{escaped_key}{PROPERTY_MARKER}{escaped_value}")
+            self._append(encoded)
+        self._started = True
+
+    def _append(self, text: str) -> None:
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.flush_size:
+            self.flush()
+
+
+class SLDWriter(_RecordWriter):
+    """Stream records to a text or binary file-like sink in SLD format.
+
+    Output is identical to encode_sld(list(records)), but only about
+    flush_size characters are held in memory at a time.
+
+    Examples:
+        >>> out = io.StringIO()
+        >>> with SLDWriter(out) as w:
+        ...     w.write_all({"id": i} for i in range(2))
+        2
+        >>> out.getvalue()
+        'id[0~id[1~'
+    """
+
+    fmt = "sld"
+
+
+class MLDWriter(_RecordWriter):
+    """Stream records to a text or binary file-like sink in MLD format.
+
+    Output is identical to encode_mld(list(records)): one record per line,
+    without a trailing newline.
+    """
 
-    return FIELD_SEPARATOR.join(parts)
+    fmt = "mld"
 
 
 def decode_sld(sld_string: str) -> Union[List[Dict], Dict]:
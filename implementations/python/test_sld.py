@@ -2,10 +2,13 @@
 Unit tests for SLD/MLD Python Implementation v2.0
 """
 
+import io
+
 import pytest
 from sld import (
     encode_sld, decode_sld, encode_mld, decode_mld,
-    sld_to_mld, mld_to_sld, escape_value, unescape_value
+    sld_to_mld, mld_to_sld, escape_value, unescape_value, split_unescaped,
+    SLDWriter, MLDWriter, _record_encoder
 )
 
 
@@ -34,6 +37,25 @@ class TestEscaping:
         assert unescape_value("a^;b^~c") == "a;b~c"
 
 
+class TestSplitting:
+    """Test split_unescaped"""
+
+    def test_plain_text(self):
+        assert split_unescaped("a;b;;c;", ";") == ["a", "b", "", "c", ""]
+
+    def test_empty_text(self):
+        assert split_unescaped("", ";") == []
+
+    def test_escaped_delimiter(self):
+        assert split_unescaped("a^;b;c", ";") == ["a^;b", "c"]
+
+    def test_escaped_caret_before_delimiter(self):
+        assert split_unescaped("a^^;b^^^;c", ";") == ["a^^", "b^^^;c"]
+
+    def test_dangling_escape(self):
+        assert split_unescaped("a;b^", ";") == ["a", "b^"]
+
+
 class TestSLDEncoding:
     """Test SLD encoding"""
 
@@ -77,6 +99,31 @@ class TestSLDEncoding:
         assert "note[Price: $5^;99" in sld
 
 
+class TestCompiledEncoders:
+    """Test per-layout record encoder reuse"""
+
+    def test_layout_compiled_once(self):
+        _record_encoder.cache_clear()
+        encode_sld([{"n;ame": f"User {i}", "ok": i % 2 == 0} for i in range(10)])
+        info = _record_encoder.cache_info()
+        assert info.misses == 1
+        assert info.hits == 9
+
+    def test_key_order_preserved(self):
+        assert encode_sld({"b": 1, "a": 2}) == "b[1;a[2"
+        assert encode_sld({"a": 2, "b": 1}) == "a[2;b[1"
+
+    def test_value_types_within_layout(self):
+        records = [{"v": "x;y"}, {"v": None}, {"v": False}, {"v": 1.5}, {"v": ["a", "b"]}]
+        assert encode_mld(records) == "v[x^;y\nv[^_\nv[^0\nv[1.5\nv{a,b"
+
+    def test_equal_non_str_keys_not_shared(self):
+        # 1 == 1.0 == True, but each key keeps its own spelling
+        assert encode_sld({1: "a"}) == "1[a"
+        assert encode_sld({True: "a"}) == "True[a"
+        assert encode_sld({1.0: "a"}) == "1.0[a"
+
+
 class TestSLDDecoding:
     """Test SLD decoding"""
 
@@ -146,6 +193,51 @@ class TestMLDDecoding:
         assert len(data) == 2
 
 
+class TestStreamingWriters:
+    """Test SLDWriter and MLDWriter"""
+
+    records = [{"name": "Alice", "age": 30}, {"name": "B;ob", "tags": ["x"]}]
+
+    def test_sld_writer_matches_encode_sld(self):
+        out = io.StringIO()
+        with SLDWriter(out) as w:
+            w.write_all(iter(self.records))
+        assert out.getvalue() == encode_sld(self.records)
+
+    def test_mld_writer_matches_encode_mld(self):
+        out = io.StringIO()
+        with MLDWriter(out) as w:
+            w.write_all(rec for rec in self.records)
+        assert out.getvalue() == encode_mld(self.records)
+
+    def test_header_written_once(self):
+        out = io.StringIO()
+        with MLDWriter(out, header={"!v": "2.0"}) as w:
+            for rec in self.records:
+                w.write(rec)
+        assert out.getvalue().split("\n")[0] == "!v[2.0"
+        assert w.count == 2
+
+    def test_binary_sink_and_small_flush_size(self):
+        out = io.BytesIO()
+        with SLDWriter(out, flush_size=1) as w:
+            w.write_all([{"city": "Zürich"}] * 3)
+        assert out.getvalue() == encode_sld([{"city": "Zürich"}] * 3).encode("utf-8")
+
+    def test_output_is_buffered(self):
+        out = io.StringIO()
+        w = SLDWriter(out, flush_size=1024)
+        w.write({"name": "Alice"})
+        assert out.getvalue() == ""
+        w.close()
+        assert out.getvalue() == "name[Alice~"
+
+    def test_empty_input(self):
+        out = io.StringIO()
+        SLDWriter(out).close()
+        assert out.getvalue() == encode_sld([])
+
+
 class TestFormatConversion:
     """Test conversion between SLD and MLD"""
 
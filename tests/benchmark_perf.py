@@ -20,8 +20,10 @@ import time
 from typing import List, Dict, Any
 
 sys.path.insert(0, 'tools')
+sys.path.insert(0, 'implementations/python')
 from validator import parse_sld, parse_mld
 from canonicalizer import encode_record
+from sld import decode_sld, decode_mld
 
 
 def generate_test_data(num_records: int = 1000) -> List[Dict[str, Any]]:
@@ -40,6 +42,46 @@ def generate_test_data(num_records: int = 1000) -> List[Dict[str, Any]]:
     return records
 
 
+def generate_text_data(num_records: int = 1000, escaped: bool = False) -> List[Dict[str, Any]]:
+    """Generate string-only records, optionally full of characters needing escapes."""
+    special = "; ~ [ { ^ " if escaped else ""
+    records = []
+    for i in range(num_records):
+        records.append({
+            "id": str(i),
+            "name": f"User_{i}{special}",
+            "email": f"user{i}@example.com",
+            "city": f"City {special}{i % 50}",
+            "description": f"A test record {special}with some text",
+        })
+    return records
+
+
+def benchmark(fn, data: str, iterations: int = 10) -> float:
+    start = time.perf_counter()
+    for _ in range(iterations):
+        fn(data)
+    return (time.perf_counter() - start) / iterations
+
+
+def benchmark_escape_paths(num_records: int = 1000) -> None:
+    """Compare decode speed on escape-free versus escape-heavy input."""
+    print("Escape-free vs escape-heavy input")
+    for label, escaped in (("escape-free", False), ("escape-heavy", True)):
+        records = generate_text_data(num_records, escaped)
+        parts = [encode_record(rec) for rec in records]
+        data_sld = "~".join(parts) + "~"
+        data_mld = "\n".join(parts)
+        for name, fn, data in (("parse_sld", parse_sld, data_sld),
+                               ("parse_mld", parse_mld, data_mld),
+                               ("sld.decode_sld", decode_sld, data_sld),
+                               ("sld.decode_mld", decode_mld, data_mld)):
+            elapsed = benchmark(fn, data)
+            print(f"  {label:<13} {name:<15} {elapsed*1000:7.2f} ms  "
+                  f"({len(records)/elapsed:,.0f} records/sec)")
+    print()
+
+
 def benchmark_parse_sld(data_sld: str, iterations: int = 100) -> float:
     """Benchmark SLD parsing."""
     start = time.perf_counter()
@@ -104,7 +146,9 @@ def main():
     print(f"JSON serialize (avg): {json_serialize_time*1000:.2f} ms\n")
 
     print(f"SLD parse vs JSON: {parse_time/json_parse_time:.2f}x slower")
-    print(f"SLD serialize vs JSON: {serialize_time/json_serialize_time:.2f}x slower")
+    print(f"SLD serialize vs JSON: {serialize_time/json_serialize_time:.2f}x slower\n")
+
+    benchmark_escape_paths(len(records))
 
 
 if __name__ == '__main__':
@@ -12,17 +12,66 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import asyncio
 import glob
+import io
 import json
+import math
 import os
+import shutil
 import subprocess
 import sys
+import tempfile
 
 ROOT = os.path.abspath(os.path.join(os.path.dirname(__file__), os.pardir))
 TOOLS = os.path.join(ROOT, "tools")
 VALIDATOR = os.path.join(TOOLS, "validator.py")
 VEC_DIR = os.path.join(os.path.dirname(__file__), "vectors")
 
+sys.path.insert(0, TOOLS)
+import validator  # noqa: E402
+import aggregate  # noqa: E402
+import canonicalizer  # noqa: E402
+import convert  # noqa: E402
+import parallel  # noqa: E402
+import query  # noqa: E402
+import index  # noqa: E402
+
+try:
+    import numpy  # noqa: E402
+    import numpy_backend  # noqa: E402
+except ImportError:  # optional: the NumPy cases are skipped
+    numpy_backend = None
+
+# Small sizes force escapes and arrays to straddle chunk edges
+STREAM_CHUNK_SIZES = (1, 2, 3, 7, 64)
+
+# Byte ranges small enough to give every worker several records
+PARALLEL_CHUNK_SIZES = (1, 16)
+
+# Malformed input for validate(): (format, data, code, byte offset, record).
+# Offsets count the bytes of multi-byte characters and of the newlines
+# inside SLD records.
+VALIDATE_ERRORS = (
+    ("sld", b"a[1~b[x^", "E01", 7, 1),
+    ("sld", b"data[value}~", "E01", 10, 0),
+    ("sld", b"a[1~b[x\ny[1;zz~", "E01", 9, 1),
+    ("mld", b"a[1\nb[x[y", "E01", 7, 1),
+    ("sld", b"a[x~bad{1~2", "E02", 7, 1),
+    ("mld", b"a[1\ntags{a~b~c", "E02", 8, 1),
+    ("sld", b"name[John;Smith~", "E03", 15, 0),
+    ("sld", b"a{x}y~", "E03", 4, 0),
+    ("sld", "a[1~é[x;b!b[2~".encode("utf-8"), "E04", 13, 1),
+    ("mld", b"flag[^1x", "E04", 5, 0),
+    ("sld", b"n!n[3~", "E05", 4, 0),
+    ("mld", "ü[1\nv[^_x".encode("utf-8"), "E05", 7, 1),
+    ("sld", b"age!z[30~", "E06", 3, 0),
+    ("sld", b"a[1~b[\xe9~", "E08", 6, 1),
+    ("mld", b"a[1\nb[\xc3\x28", "E08", 6, 1),
+    ("sld", b"!v[abc~a[1~", "E09", 0, 0),
+    ("mld", b"a[1\n!v[2", "E09", 4, 1),
+)
+
 
 def run_case(inp_path: str, exp_path: str, force_fmt: str = None) -> bool:
     cmd = [sys.executable, VALIDATOR, inp_path]
@@ -48,6 +97,514 @@ def run_case(inp_path: str, exp_path: str, force_fmt: str = None) -> bool:
         return False
 
 
+def run_stream_case(inp_path: str, fmt: str) -> bool:
+    """Streaming readers, lazy records, projections, filters and visitors must match the whole-text parser."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    parse = validator.parse_mld if fmt == "mld" else validator.parse_sld
+    expected = parse(text)
+    iter_parse = validator.iter_parse_mld if fmt == "mld" else validator.iter_parse_sld
+    for size in STREAM_CHUNK_SIZES:
+        with open(inp_path, "rb") as f:
+            got = list(iter_parse(f, chunk_size=size))
+        if got != expected:
+            print(f"FAIL: {name} streaming mismatch at chunk_size={size}")
+            return False
+    with open(inp_path, "rb") as f:
+        texts = list(validator.iter_record_texts(f, fmt, chunk_size=7))
+    if texts != list(validator.iter_record_texts(inp_path, fmt)) or [validator.parse_record(t) for t in texts] != expected:
+        print(f"FAIL: {name} iter_record_texts mismatch")
+        return False
+    aiter = validator.aiter_mld if fmt == "mld" else validator.aiter_sld
+
+    async def read_async(size: int) -> list:
+        reader = asyncio.StreamReader()
+        reader.feed_data(text.encode("utf-8"))
+        reader.feed_eof()
+        return [rec async for rec in aiter(reader, chunk_size=size, batch_size=2)]
+
+    for size in STREAM_CHUNK_SIZES:
+        if asyncio.run(read_async(size)) != expected:
+            print(f"FAIL: {name} async streaming mismatch at chunk_size={size}")
+            return False
+    lazy = parse(text, lazy=True)
+    if [dict(rec) for rec in lazy] != expected or [list(rec) for rec in lazy] != [list(rec) for rec in expected]:
+        print(f"FAIL: {name} lazy records mismatch")
+        return False
+    # project onto every other key seen in the document
+    keys = sorted({key for rec in expected for key in rec})[::2]
+    projected = [{k: v for k, v in rec.items() if k in keys} for rec in expected]
+    with open(inp_path, "rb") as f:
+        streamed = list(iter_parse(f, chunk_size=STREAM_CHUNK_SIZES[-1], fields=keys))
+    if parse(text, fields=keys) != projected or streamed != projected:
+        print(f"FAIL: {name} projection mismatch for {keys}")
+        return False
+    # filter on each key/value of the last record
+    for key, value in (expected[-1].items() if expected else ()):
+        where = [validator.Equals(key, value)]
+        wanted = [rec for rec in expected if key in rec and rec[key] == value
+                  and isinstance(rec[key], bool) == isinstance(value, bool)]
+        with open(inp_path, "rb") as f:
+            streamed = list(iter_parse(f, chunk_size=STREAM_CHUNK_SIZES[-1], where=where))
+        if parse(text, where=where) != wanted or streamed != wanted:
+            print(f"FAIL: {name} filter mismatch for {key}={value!r}")
+            return False
+    # booleans and numbers that compare equal are told apart
+    mixed = "n!i[1;b!b[1;f!f[1.0" + ("\n" if fmt == "mld" else "~") + "n!b[1;b!i[1;f!b[1"
+    for key, value, row in (("n", 1, 0), ("n", True, 1), ("b", True, 0), ("b", 1, 1), ("f", 1, 0), ("f", True, 1)):
+        if parse(mixed, where=[validator.Equals(key, value)]) != [parse(mixed)[row]]:
+            print(f"FAIL: {name} filter {key}={value!r} matched across bool and number")
+            return False
+    # visitor events rebuilt into dicts, from the text and from the file
+    class Rebuild(validator.Visitor):
+        def __init__(self):
+            self.records = []
+
+        def on_record_start(self, index: int) -> None:
+            self.record = {}
+
+        def on_field(self, key, value, type_code) -> None:
+            self.record[key] = value
+
+        def on_array_start(self, key, type_code) -> None:
+            self.items = []
+
+        def on_array_item(self, value) -> None:
+            self.items.append(value)
+
+        def on_array_end(self, key) -> None:
+            self.record[key] = self.items
+
+        def on_record_end(self, index: int) -> None:
+            self.records.append(self.record)
+
+    visit = validator.visit_mld if fmt == "mld" else validator.visit_sld
+    for run in (lambda v: visit(text, v), lambda v: validator.visit_file(inp_path, v, fmt)):
+        visitor = Rebuild()
+        if run(visitor) != len(expected) or visitor.records != expected:
+            print(f"FAIL: {name} visitor mismatch")
+            return False
+    print(f"PASS: {name} (streaming)")
+    return True
+
+
+def run_incremental_case(inp_path: str) -> bool:
+    """The SLD push parser must match parse_sld and report a truncated tail from close()."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "rb") as f:
+        data = f.read()
+
+    def decode(data: bytes, size: int, strict: bool) -> list:
+        decoder = validator.SLDIncrementalDecoder(strict=strict)
+        got = []
+        for i in range(0, len(data), size):
+            got += decoder.feed(data[i:i + size])
+        return got + decoder.close()
+
+    # a trailing escaped '~' followed by the terminator is complete
+    prefix = data.rstrip(b"\r\n~") + b"~"
+    for doc in (data, prefix + b"z[x^~~", prefix + b"z[x^~"):
+        expected = validator.parse_sld(doc.decode("utf-8"))
+        for size in STREAM_CHUNK_SIZES:
+            for strict in (True, False):
+                if decode(doc, size, strict) != expected:
+                    print(f"FAIL: {name} incremental decoder mismatch at fragment size={size}, strict={strict}")
+                    return False
+    count = len(validator.parse_sld(prefix.decode("utf-8")))
+    for tail, code, strict_only in ((b"z[x^", "E01", True), (b"z{a~b", "E02", True),
+                                    (b"z[\xc3", "E08", False)):
+        for strict in (True, False):
+            try:
+                decode(prefix + tail, 3, strict)
+            except validator.ParseError as e:
+                if e.code != code or not strict and strict_only or f"record {count}" not in str(e):
+                    print(f"FAIL: {name} incremental decoder raised {e.code} ({e}) for {tail!r}, strict={strict}")
+                    return False
+            else:
+                if strict or not strict_only:
+                    print(f"FAIL: {name} incremental decoder accepted {tail!r}, strict={strict}")
+                    return False
+    print(f"PASS: {name} (incremental)")
+    return True
+
+
+def run_writer_case(inp_path: str, fmt: str) -> bool:
+    """RecordWriter must match canonicalize_sld/canonicalize_mld at any flush size."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    expected = canonicalizer.canonicalize_mld(text) if fmt == "mld" else canonicalizer.canonicalize_sld(text)
+    header, body = validator.detect_header(validator.parse_mld(text) if fmt == "mld" else validator.parse_sld(text))
+    for size in STREAM_CHUNK_SIZES:
+        for out in (io.StringIO(), io.BytesIO()):
+            with canonicalizer.RecordWriter(out, fmt, header, flush_size=size) as writer:
+                writer.write_all(body)
+            got = out.getvalue()
+            if (got.decode("utf-8") if isinstance(got, bytes) else got) != expected:
+                print(f"FAIL: {name} record writer mismatch at flush_size={size}")
+                return False
+    print(f"PASS: {name} (writer)")
+    return True
+
+
+def run_async_writer_case(inp_path: str, fmt: str) -> bool:
+    """AsyncRecordWriter with tiny flush/drain sizes must match RecordWriter."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    header, body = validator.detect_header(validator.parse_mld(text) if fmt == "mld" else validator.parse_sld(text))
+    sync_out = io.BytesIO()
+    with canonicalizer.RecordWriter(sync_out, fmt, header) as writer:
+        writer.write_all(body)
+
+    class Stream:
+        def __init__(self):
+            self.data = bytearray()
+            self.drains = 0
+
+        def write(self, data: bytes) -> None:
+            self.data += data
+
+        async def drain(self) -> None:
+            self.drains += 1
+
+    async def write_async() -> Stream:
+        stream = Stream()
+        async with canonicalizer.AsyncRecordWriter(stream, fmt, header, flush_size=8, drain_size=16) as writer:
+            await writer.awrite_all(body)
+        return stream
+
+    stream = asyncio.run(write_async())
+    if bytes(stream.data) != sync_out.getvalue() or not stream.drains:
+        print(f"FAIL: {name} async writer mismatch")
+        return False
+    print(f"PASS: {name} (async writer)")
+    return True
+
+
+def run_json_output_case(inp_path: str, fmt: str) -> bool:
+    """Streamed JSON document and JSON Lines must hold the parsed header and records."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    header, body = validator.detect_header(validator.parse_mld(text) if fmt == "mld" else validator.parse_sld(text))
+    iter_parse = validator.iter_parse_mld if fmt == "mld" else validator.iter_parse_sld
+    for lines in (False, True):
+        out = io.StringIO()
+        with open(inp_path, "rb") as f:
+            head, rest = validator.iter_detect_header(iter_parse(f, chunk_size=STREAM_CHUNK_SIZES[-1]))
+            validator.write_json(out, head, rest, lines)
+        if lines:
+            got = [json.loads(line) for line in out.getvalue().splitlines()]
+            want = ([header] if header is not None else []) + body
+        else:
+            got, want = json.loads(out.getvalue()), {"header": header, "records": body}
+        if got != want:
+            print(f"FAIL: {name} JSON {'Lines ' if lines else ''}output mismatch")
+            return False
+    print(f"PASS: {name} (JSON output)")
+    return True
+
+
+def run_jsonl_input_case(inp_path: str, fmt: str) -> bool:
+    """JSON Lines back to the input format must match the record writer."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    header, body = validator.detect_header(validator.parse_mld(text) if fmt == "mld" else validator.parse_sld(text))
+    expected = io.StringIO()
+    with canonicalizer.RecordWriter(expected, fmt, header) as writer:
+        writer.write_all(body)
+    with tempfile.TemporaryDirectory() as tmp:
+        jsonl_path = os.path.join(tmp, "records.jsonl")
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            validator.write_json(f, header, body, lines=True)
+        out = io.StringIO()
+        convert.stream_from_jsonl(jsonl_path, fmt, out)
+        # jsonl to jsonl is streamed too, dropping blank lines
+        with open(jsonl_path, "r", encoding="utf-8") as f:
+            lines = f.read()
+        with open(jsonl_path, "w", encoding="utf-8") as f:
+            f.write(lines.replace("\n", "\n\n"))
+        copy_path = os.path.join(tmp, "copy.jsonl")
+        code = convert.main(["--from", "jsonl", "--to", "jsonl", jsonl_path, "-o", copy_path])
+        with open(copy_path, "r", encoding="utf-8") as f:
+            copied = f.read()
+    if out.getvalue() != expected.getvalue():
+        print(f"FAIL: {name} JSON Lines input mismatch")
+        return False
+    if code != 0 or copied != lines:
+        print(f"FAIL: {name} JSON Lines copy mismatch")
+        return False
+    print(f"PASS: {name} (JSON Lines input)")
+    return True
+
+
+def run_columns_case(inp_path: str, fmt: str) -> bool:
+    """parse_columns must hold the same values as pivoting the parsed records."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    records = validator.parse_mld(text) if fmt == "mld" else validator.parse_sld(text)
+    header, body = validator.detect_header(records)
+    expected = {}
+    for rec in body:
+        for key in rec:
+            expected.setdefault(key, [r.get(key) for r in body])
+    got_header, columns = validator.parse_columns(text, fmt)
+    got = {key: col.to_list() for key, col in columns.items()}
+    if got_header != header or got != expected:
+        print(f"FAIL: {name} columns mismatch")
+        print(f"  GOT: {json.dumps(got, ensure_ascii=False)[:200]}")
+        print(f"  EXP: {json.dumps(expected, ensure_ascii=False)[:200]}")
+        return False
+    print(f"PASS: {name} (columns)")
+    return True
+
+
+def _pivot(records: list) -> dict:
+    # key -> values of every record, None where a record lacks the key
+    columns = {}
+    for rec in records:
+        for key in rec:
+            columns.setdefault(key, [r.get(key) for r in records])
+    return columns
+
+
+def _same_cells(got: list, want: list) -> bool:
+    # Equal values of equal types (True is not 1), NaN matching NaN
+    return len(got) == len(want) and all(
+        (type(a) is type(b) and (a == b or a != a and b != b)) for a, b in zip(got, want))
+
+
+def _column_cells(col) -> list:
+    # Python values of a NumPy column, None for masked cells
+    if isinstance(col, numpy.ndarray):
+        return col.tolist()
+    return col
+
+
+def run_numpy_case(inp_path: str, fmt: str) -> bool:
+    """parse_columns_numpy must hold the values of the pivoted parsed records."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "r", encoding="utf-8") as f:
+        text = f.read()
+    header, body = validator.detect_header(validator.parse_mld(text) if fmt == "mld" else validator.parse_sld(text))
+    expected = _pivot(body)
+    got_header, columns = numpy_backend.parse_columns_numpy(text, fmt)
+    if got_header != header or list(columns) != list(expected) or not all(
+            _same_cells(_column_cells(columns[k]), expected[k]) for k in expected):
+        print(f"FAIL: {name} NumPy columns mismatch")
+        return False
+    print(f"PASS: {name} (numpy)")
+    return True
+
+
+def run_numpy_edge_cases() -> bool:
+    """NumPy dtypes, masks and list fallbacks; encoders against encode_record."""
+    np = numpy
+    records = [{"n": 1, "f": 1.5, "b": True, "big": 1, "mix": 1, "s": "x"},
+               {"n": None, "f": 2.0, "b": False, "big": 2 ** 70, "mix": "y", "s": "y;z"},
+               {"f": None, "b": True, "big": 3, "mix": 2}]
+    text = "~".join(canonicalizer.encode_record(rec) for rec in records) + "~"
+    for fmt, doc in (("sld", text), ("mld", text.rstrip("~").replace("~", "\n"))):
+        _, columns = numpy_backend.parse_columns_numpy(doc, fmt)
+        kinds = {key: (type(col).__name__, getattr(col, "dtype", None)) for key, col in columns.items()}
+        want = {"n": ("MaskedArray", np.int64), "f": ("MaskedArray", np.float64), "b": ("ndarray", np.bool_),
+                "big": ("list", None), "mix": ("list", None), "s": ("list", None)}
+        expected = _pivot(records)
+        if kinds != want or not all(_same_cells(_column_cells(columns[k]), expected[k]) for k in expected):
+            print(f"FAIL: NumPy edge columns ({fmt}) gave {kinds}")
+            return False
+    columns = {"n": np.ma.MaskedArray([1, 2, 3], mask=[False, True, False]),
+               "f": np.array([1.5, -0.25, 1e20]), "b": np.array([True, False, True]),
+               "s": ["x", "y;z", None]}
+    rows = [{"n": 1, "f": 1.5, "b": True, "s": "x"}, {"n": None, "f": -0.25, "b": False, "s": "y;z"},
+            {"n": 3, "f": 1e20, "b": True, "s": None}]
+    header = {"!v": "2.0"}
+    lines = [canonicalizer.encode_header(header)] + [canonicalizer.encode_record(rec) for rec in rows]
+    if (numpy_backend.encode_columns(columns, "sld", header) != "~".join(lines) + "~"
+            or numpy_backend.encode_columns(columns, "mld", header) != "\n".join(lines)):
+        print("FAIL: NumPy encode_columns mismatch")
+        return False
+    recarray = np.array([(1, 1.5, True), (2, -0.25, False)], dtype=[("n", "i8"), ("f", "f8"), ("b", "?")])
+    want = "\n".join(canonicalizer.encode_record({"n": int(n), "f": float(f), "b": bool(b)}) for n, f, b in recarray)
+    if numpy_backend.encode_recarray(recarray, "mld") != want:
+        print("FAIL: NumPy encode_recarray mismatch")
+        return False
+    print("PASS: NumPy dtypes, masks, fallbacks and encoders (numpy)")
+    return True
+
+
+def run_parallel_case(inp_path: str, fmt: str) -> bool:
+    """Multi-process decoding must return the records of the serial parser."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "r", encoding="utf-8") as f:
+        expected = validator.parse_mld(f.read()) if fmt == "mld" else validator.parse_sld(f.read())
+    parse = parallel.parse_mld_parallel if fmt == "mld" else parallel.parse_sld_parallel
+    for size in PARALLEL_CHUNK_SIZES:
+        got = parse(inp_path, workers=2, chunk_size=size)
+        if got != expected:
+            print(f"FAIL: {name} parallel mismatch at chunk_size={size}")
+            return False
+    print(f"PASS: {name} (parallel)")
+    return True
+
+
+def run_index_case(inp_path: str, fmt: str) -> bool:
+    """Indexed reads, fresh and from the sidecars, must match the parsed list."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "r", encoding="utf-8") as f:
+        expected = validator.parse_mld(f.read()) if fmt == "mld" else validator.parse_sld(f.read())
+    with tempfile.TemporaryDirectory() as tmp:
+        # sidecars are written next to the file, so work on a copy
+        path = shutil.copy(inp_path, tmp)
+        for _ in range(2):
+            with index.RecordTable(path, fmt) as table:
+                got = [table[i] for i in range(len(table))]
+                if got != expected or table[1:] != expected[1:] or table[::-1] != expected[::-1]:
+                    print(f"FAIL: {name} indexed read mismatch")
+                    return False
+                # every indexable value finds exactly the records holding it
+                for rec in expected:
+                    for key, value in rec.items():
+                        if index.index_key(value) is None:
+                            continue
+                        want = [r for r in expected if key in r and index.index_key(r[key]) == index.index_key(value)]
+                        if table.find(key, value) != want:
+                            print(f"FAIL: {name} key lookup mismatch for {key}={value!r}")
+                            return False
+    print(f"PASS: {name} (index)")
+    return True
+
+
+def run_index_update_case(inp_path: str, fmt: str) -> bool:
+    """Sidecars must be extended after an append and rebuilt after a rewrite that grows the file."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "rb") as f:
+        data = f.read()
+    sep = b"\n" if fmt == "mld" else b"~"
+    extra = b"id[9;name[zed-longer-name-here" + sep
+    changes = (("append", data.rstrip(b"\r\n") + (sep if fmt == "mld" else b"") + extra),
+               ("rewrite", extra + data))
+    for how, new_data in changes:
+        with tempfile.TemporaryDirectory() as tmp:
+            path = shutil.copy(inp_path, tmp)
+            with index.RecordTable(path, fmt) as table:
+                keys = {key for rec in table for key in rec} | {"id"}
+                for key in keys:
+                    table.key_index(key)
+            old_index = index.open_index(path, fmt)
+            old_keys = {key: index.open_key_index(path, key, fmt) for key in keys}
+            with open(path, "r+b" if how == "append" else "wb") as f:
+                f.seek(0, os.SEEK_END)
+                f.write(new_data[len(data):] if how == "append" else new_data)
+            with open(path, "r", encoding="utf-8") as f:
+                expected = validator.parse_mld(f.read()) if fmt == "mld" else validator.parse_sld(f.read())
+            if index.update_index(old_index, path).spans != index.build_index(path, fmt).spans:
+                print(f"FAIL: {name} record index {how} mismatch")
+                return False
+            for key, old in old_keys.items():
+                got, want = index.update_key_index(old, path), index.build_key_index(path, key, fmt)
+                if (got.keys, got.spans) != (want.keys, want.spans):
+                    print(f"FAIL: {name} key index {how} mismatch for {key}")
+                    return False
+            # and through the stale sidecars
+            with index.RecordTable(path, fmt) as table:
+                if list(table) != expected or table.find("id", "9") != [r for r in expected if r.get("id") == "9"]:
+                    print(f"FAIL: {name} indexed read mismatch after {how}")
+                    return False
+    print(f"PASS: {name} (index update)")
+    return True
+
+
+def run_query_case(inp_path: str, fmt: str) -> bool:
+    """Queries by path and over a file object must match the parsed body."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "r", encoding="utf-8") as f:
+        expected = validator.detect_header(validator.parse_mld(f.read()) if fmt == "mld" else validator.parse_sld(f.read()))
+    for offset, limit in ((0, None), (1, 1), (0, 0)):
+        with open(inp_path, "r", encoding="utf-8") as f:
+            for source in (inp_path, f):
+                header, records = query.query(source, fmt, offset=offset, limit=limit)
+                stop = None if limit is None else offset + limit
+                if (header, list(records)) != (expected[0], expected[1][offset:stop]):
+                    print(f"FAIL: {name} query mismatch (offset={offset}, limit={limit})")
+                    return False
+    body = expected[1]
+    if body:
+        where = [query.parse_where(f"{k}={v}") for k, v in body[-1].items() if isinstance(v, str)]
+        want = [r for r in body if all(p.test(r) for p in where)]
+        if list(query.query(inp_path, fmt, where=where)[1]) != want:
+            print(f"FAIL: {name} query where mismatch")
+            return False
+    # JSON Lines output carries the header first, as convert.py writes it
+    p = subprocess.run([sys.executable, os.path.join(TOOLS, "query.py"), inp_path, "--format", fmt],
+                       stdout=subprocess.PIPE, text=True, encoding="utf-8")
+    lines = [json.loads(line) for line in p.stdout.splitlines()]
+    if p.returncode != 0 or lines != ([expected[0]] if expected[0] is not None else []) + body:
+        print(f"FAIL: {name} query --output jsonl mismatch")
+        return False
+    print(f"PASS: {name} (query)")
+    return True
+
+
+def run_aggregate_case(inp_path: str, fmt: str) -> bool:
+    """Streamed and multi-process group-by must match grouping the parsed body."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "r", encoding="utf-8") as f:
+        body = validator.detect_header(validator.parse_mld(f.read()) if fmt == "mld" else validator.parse_sld(f.read()))[1]
+    keys = list(dict.fromkeys(k for rec in body for k in rec))
+    for by in [[]] + [[k] for k in keys]:
+        aggs = [aggregate.Aggregate("count")] + [aggregate.Aggregate(op, k) for k in keys
+                                                  for op in ("count", "sum", "min", "max", "distinct")]
+        want = aggregate.GroupBy(by, aggs).update(body).rows()
+        for workers, chunk_size in ((1, None), (2, 16)):
+            got = aggregate.aggregate(inp_path, by, aggs, fmt, workers=workers,
+                                      chunk_size=chunk_size or parallel.DEFAULT_PARALLEL_CHUNK_SIZE)
+            if got != want:
+                print(f"FAIL: {name} aggregate mismatch (by={by}, workers={workers})")
+                return False
+    print(f"PASS: {name} (aggregate)")
+    return True
+
+
+def run_aggregate_sums() -> bool:
+    """Parallel sums: integers exactly as serial ones, floats up to rounding."""
+    lines = [f"g[{n % 3};i!i[{n * 7919};f!f[{n / 10}" for n in range(500)]
+    with tempfile.TemporaryDirectory() as tmp:
+        path = os.path.join(tmp, "sums.mld")
+        with open(path, "w", encoding="utf-8") as f:
+            f.write("\n".join(lines))
+        aggs = ["count", "sum:i", "sum:f"]
+        want = aggregate.aggregate(path, ["g"], aggs)
+        got = aggregate.aggregate(path, ["g"], aggs, workers=2, chunk_size=64)
+    for w, g in zip(want, got):
+        if ([w["g"], w["count"], w["sum_i"]] != [g["g"], g["count"], g["sum_i"]]
+                or not math.isclose(w["sum_f"], g["sum_f"], rel_tol=1e-12)):
+            print(f"FAIL: aggregate parallel sums {g} != {w}")
+            return False
+    if len(got) != len(want):
+        print("FAIL: aggregate parallel sums group mismatch")
+        return False
+    print("PASS: aggregate parallel sums")
+    return True
+
+
+def run_cli_imports() -> bool:
+    """The CLI modules must not import asyncio (only aiter_sld/aiter_mld need it)."""
+    code = (f"import sys; sys.path.insert(0, {TOOLS!r}); "
+            "import validator, canonicalizer, convert, query, aggregate, index; "
+            "print('asyncio' in sys.modules)")
+    p = subprocess.run([sys.executable, "-c", code], stdout=subprocess.PIPE, text=True)
+    if p.stdout.strip() != "False":
+        print(f"FAIL: CLI modules import asyncio ({p.stdout.strip() or p.returncode})")
+        return False
+    print("PASS: CLI modules do not import asyncio")
+    return True
+
+
 def discover_tests():
     """Auto-discover test pairs (*.sld/*.mld → *.json)"""
     tests = []
@@ -69,6 +626,51 @@ def discover_tests():
     return tests
 
 
+def run_validate_case(inp_path: str, fmt: str) -> bool:
+    """The syntax check must accept every vector and count the parsed records."""
+    name = os.path.basename(inp_path)
+    with open(inp_path, "rb") as f:
+        data = f.read()
+    text = data.decode("utf-8")
+    expected = len(validator.parse_mld(text) if fmt == "mld" else validator.parse_sld(text))
+    counts = [validator.validate(inp_path, fmt),
+              validator.validate(io.BytesIO(data), fmt, chunk_size=3)]
+    if counts != [expected, expected]:
+        print(f"FAIL: {name} validate counted {counts}, expected {expected}")
+        return False
+    # an unterminated array appended as one more record is reported there
+    tail = data.rstrip(b"\r\n~") + (b"\nx{1\n" if fmt == "mld" else b"~x{1")
+    try:
+        validator.validate(io.BytesIO(tail), fmt, chunk_size=3)
+    except validator.ParseError as e:
+        if e.code == "E02" and e.record == expected:
+            print(f"PASS: {name} (validate)")
+            return True
+    print(f"FAIL: {name} validate missed an unterminated array")
+    return False
+
+
+def run_validate_errors() -> bool:
+    """validate() must report each malformed input with its code, byte offset and record."""
+    with tempfile.TemporaryDirectory() as tmp:
+        for n, (fmt, data, code, pos, record) in enumerate(VALIDATE_ERRORS):
+            path = os.path.join(tmp, f"error{n}.{fmt}")
+            with open(path, "wb") as f:
+                f.write(data)
+            for source, size in ((path, None), (io.BytesIO(data), 1), (io.BytesIO(data), 3)):
+                try:
+                    validator.validate(source, fmt, **({"chunk_size": size} if size else {}))
+                except validator.ParseError as e:
+                    if (e.code, e.pos, e.record) == (code, pos, record):
+                        continue
+                    print(f"FAIL: validate {data!r} gave {(e.code, e.pos, e.record)}, expected {(code, pos, record)}")
+                    return False
+                print(f"FAIL: validate accepted {data!r}")
+                return False
+    print(f"PASS: {len(VALIDATE_ERRORS)} malformed inputs (validate)")
+    return True
+
+
 def main() -> int:
     tests = discover_tests()
 
@@ -82,7 +684,34 @@ def main() -> int:
     failed = 0
 
     for inp_path, exp_path, fmt in sorted(tests):
-        if run_case(inp_path, exp_path, fmt):
+        results = [run_case(inp_path, exp_path, fmt),
+                   run_stream_case(inp_path, fmt)]
+        if fmt == "sld":
+            results.append(run_incremental_case(inp_path))
+        results += [run_writer_case(inp_path, fmt),
+                    run_async_writer_case(inp_path, fmt),
+                    run_json_output_case(inp_path, fmt),
+                    run_jsonl_input_case(inp_path, fmt),
+                    run_columns_case(inp_path, fmt),
+                    run_parallel_case(inp_path, fmt),
+                    run_index_case(inp_path, fmt),
+                    run_index_update_case(inp_path, fmt),
+                    run_query_case(inp_path, fmt),
+                    run_aggregate_case(inp_path, fmt),
+                    run_validate_case(inp_path, fmt)]
+        for ok in results:
+            if ok:
+                passed += 1
+            else:
+                failed += 1
+    extra = [run_validate_errors(), run_aggregate_sums(), run_cli_imports()]
+    if numpy_backend is None:
+        print("SKIP: NumPy cases (NumPy not installed)")
+    else:
+        extra += [run_numpy_case(inp_path, fmt) for inp_path, _, fmt in sorted(tests)]
+        extra.append(run_numpy_edge_cases())
+    for ok in extra:
+        if ok:
             passed += 1
         else:
             failed += 1
@@ -0,0 +1,287 @@
+#!/usr/bin/env python3
+# Copyright 2025 Alfredo Pinto Molina
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Streaming group-by aggregation over SLD/MLD files:
+- count, count:FIELD, sum:FIELD, min:FIELD, max:FIELD, distinct:FIELD
+- Records are streamed and only one accumulator per group and aggregate is
+  kept, so memory grows with the number of groups, not of records
+- Only the group and aggregated fields are decoded (validator fields=)
+- Optionally split across worker processes (tools/parallel.py ranges), with
+  the per-range groups merged in file order
+"""
+import json
+import os
+import sys
+from typing import IO, Any, Dict, Iterable, List, Optional, Sequence, Tuple, Union
+
+from validator import byte_spans, detect_header, file_format, parse_record, record_parser
+from index import index_key
+from parallel import DEFAULT_PARALLEL_CHUNK_SIZE, map_ranges
+from query import OUTPUT_FORMATS, parse_where, query
+from canonicalizer import RecordWriter
+
+AGGREGATE_OPS = ("count", "sum", "min", "max", "distinct")
+
+
+class Aggregate:
+    """One aggregate column: op over the values of field.
+
+    sum adds numbers ('!i' / '!f' values; untyped digits are strings and
+    are ignored, as for validator.InRange). min and max compare bools,
+    numbers and strings in the order of index.py key indexes. distinct
+    counts different non-null scalar values. count without a field counts
+    records; with a field, records where it is not null. Nulls and arrays
+    are ignored by every op but plain count; an empty sum, min or max is
+    None.
+    """
+
+    __slots__ = ("op", "field", "name")
+
+    def __init__(self, op: str, field: Optional[str] = None):
+        if op not in AGGREGATE_OPS:
+            raise ValueError(f"Unknown aggregate: {op}")
+        if field is None and op != "count":
+            raise ValueError(f"{op} needs a field")
+        self.op = op
+        self.field = field
+        self.name = op if field is None else f"{op}_{field}"
+
+    @classmethod
+    def parse(cls, spec: str) -> "Aggregate":
+        """Aggregate from 'op' or 'op:field' (CLI syntax)."""
+        op, sep, field = spec.partition(":")
+        return cls(op, field if sep else None)
+
+    def start(self) -> Any:
+        if self.op == "count":
+            return 0
+        if self.op == "distinct":
+            return set()
+        return None
+
+    def add(self, state: Any, value: Any) -> Any:
+        op = self.op
+        if op == "count":
+            return state + (self.field is None or value is not None)
+        if op == "sum":
+            if not isinstance(value, (int, float)) or isinstance(value, bool):
+                return state
+            return value if state is None else state + value
+        key = index_key(value)
+        if key is None:
+            return state
+        if op == "distinct":
+            state.add(key)
+            return state
+        if state is None or (key < state if op == "min" else key > state):
+            return key
+        return state
+
+    def merge(self, a: Any, b: Any) -> Any:
+        # Combine the states of two record ranges, a before b
+        op = self.op
+        if op == "count":
+            return a + b
+        if op == "distinct":
+            a |= b
+            return a
+        if a is None or b is None:
+            return b if a is None else a
+        if op == "sum":
+            return a + b
+        if op == "min":
+            return b if b < a else a
+        return b if b > a else a
+
+    def result(self, state: Any) -> Any:
+        if self.op == "distinct":
+            return len(state)
+        if self.op in ("min", "max") and state is not None:
+            return state[1]
+        return state
+
+
+def _group_value(value: Any) -> Any:
+    # Hashable form of a group field value; arrays become tuples
+    if isinstance(value, list):
+        return tuple(_group_value(v) for v in value)
+    return value
+
+
+def _record_value(value: Any) -> Any:
+    if isinstance(value, tuple):
+        return [_record_value(v) for v in value]
+    return value
+
+
+class GroupBy:
+    """Accumulators of the aggregates, per distinct value of the by fields.
+
+    Groups are kept in order of first appearance. A record without a by
+    field falls in the group where that field is None.
+    """
+
+    def __init__(self, by: Sequence[str], aggregates: Sequence[Aggregate]):
+        self.by = tuple(by)
+        self.aggregates = tuple(aggregates)
+        self.groups: Dict[Tuple[Any, ...], List[Any]] = {}
+
+    def fields(self) -> List[str]:
+        """The fields records must be decoded with."""
+        out = list(self.by)
+        for agg in self.aggregates:
+            if agg.field is not None and agg.field not in out:
+                out.append(agg.field)
+        return out
+
+    def add(self, rec: Dict[str, Any]) -> None:
+        group = tuple(_group_value(rec.get(k)) for k in self.by)
+        states = self.groups.get(group)
+        if states is None:
+            states = self.groups[group] = [agg.start() for agg in self.aggregates]
+        for i, agg in enumerate(self.aggregates):
+            states[i] = agg.add(states[i], rec.get(agg.field) if agg.field is not None else None)
+
+    def update(self, records: Iterable[Dict[str, Any]]) -> "GroupBy":
+        for rec in records:
+            self.add(rec)
+        return self
+
+    def merge(self, other: "GroupBy") -> "GroupBy":
+        """Fold in the groups of records that come after this one's."""
+        for group, theirs in other.groups.items():
+            ours = self.groups.get(group)
+            if ours is None:
+                self.groups[group] = theirs
+            else:
+                for i, agg in enumerate(self.aggregates):
+                    ours[i] = agg.merge(ours[i], theirs[i])
+        return self
+
+    def rows(self) -> List[Dict[str, Any]]:
+        """One record per group: the by fields, then one key per aggregate."""
+        out = []
+        for group, states in self.groups.items():
+            row = {k: _record_value(v) for k, v in zip(self.by, group)}
+            for agg, state in zip(self.aggregates, states):
+                row[agg.name] = agg.result(state)
+            out.append(row)
+        return out
+
+
+def _range_texts(path: str, fmt: str, start: int, end: int) -> List[str]:
+    # Raw records in bytes [start, end), a range of parallel.map_ranges
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    return [text for _, _, text in byte_spans(data, fmt, end=len(data))]
+
+
+def _aggregate_range(path: str, start: int, end: int, fmt: str, by: Tuple[str, ...],
+                     aggregates: Tuple[Aggregate, ...],
+                     where: Optional[List[Any]]) -> Tuple[Optional[str], GroupBy]:
+    # Worker task: the first raw record of the range, which may be the
+    # file's header, and the groups of the others
+    groups = GroupBy(by, aggregates)
+    texts = _range_texts(path, fmt, start, end)
+    if not texts:
+        return None, groups
+    parse = record_parser(groups.fields(), where)
+    return texts[0], groups.update(rec for rec in map(parse, texts[1:]) if rec is not None)
+
+
+def aggregate(source: Union[str, IO], by: Sequence[str], aggregates: Sequence[Union[str, Aggregate]] = ("count",),
+              fmt: Optional[str] = None, where: Optional[Iterable[Any]] = None, workers: int = 1,
+              chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE) -> List[Dict[str, Any]]:
+    """Group the records of a file by the by fields and aggregate each group.
+
+    source is a path or an open file object (fmt is then required, see
+    query.query); a header record is not aggregated. aggregates are
+    Aggregate objects or 'op[:field]' strings. where filters records first,
+    as for validator.parse_sld. With workers > 1 (or None for
+    os.cpu_count()) a path is split into ranges of about chunk_size bytes
+    that are aggregated in worker processes. The result is the same, except
+    that a sum of floats is equal only up to rounding: the ranges' partial
+    sums are added in another order than the records. Returns one record
+    per group, see GroupBy.rows.
+    """
+    aggs = tuple(a if isinstance(a, Aggregate) else Aggregate.parse(a) for a in aggregates)
+    groups = GroupBy(by, aggs)
+    where = list(where) if where is not None else None
+    workers = workers or os.cpu_count() or 1
+    if workers == 1 or not isinstance(source, str):
+        _, records = query(source, fmt, groups.fields(), where)
+        return groups.update(records).rows()
+    if os.path.getsize(source) == 0:
+        return []
+    if fmt is None:
+        fmt = file_format(source)
+    parse = record_parser(groups.fields(), where)
+    seen = False
+    for first, part in map_ranges(_aggregate_range, source, fmt, workers, chunk_size,
+                                  (fmt, groups.by, aggs, where)):
+        if first is not None:
+            # only the file's first record may be a header
+            if seen or detect_header([parse_record(first)])[0] is None:
+                rec = parse(first)
+                if rec is not None:
+                    groups.add(rec)
+            seen = True
+        groups.merge(part)
+    return groups.rows()
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    p = argparse.ArgumentParser(description="Group and aggregate the records of an SLD/MLD file")
+    p.add_argument("file", nargs="?", help="Input file (.sld or .mld). If omitted, reads stdin")
+    p.add_argument("--format", choices=["sld", "mld"], help="Force input format detection (required for stdin)")
+    p.add_argument("--by", metavar="FIELD[,FIELD...]", default="", help="Group by these fields (default: one group)")
+    p.add_argument("--agg", metavar="OP[:FIELD]", action="append",
+                   help=f"Aggregate to compute, repeatable; OP is one of {', '.join(AGGREGATE_OPS)} (default: count)")
+    p.add_argument("--where", metavar="EXPR", action="append", default=[],
+                   help="Filter records first, as in query.py")
+    p.add_argument("--workers", type=int, default=1, help="Worker processes for file input (0: one per CPU)")
+    p.add_argument("--output", choices=OUTPUT_FORMATS, default="jsonl", help="Output format (default: jsonl)")
+    args = p.parse_args(argv)
+    if args.file is None and args.format is None:
+        p.error("--format is required when reading stdin")
+    try:
+        aggs = [Aggregate.parse(spec) for spec in args.agg or ["count"]]
+        where = [parse_where(expr) for expr in args.where] or None
+    except ValueError as e:
+        p.error(str(e))
+    by = [f for f in args.by.split(",") if f]
+
+    rows = aggregate(args.file or sys.stdin, by, aggs, args.format, where, args.workers)
+    # Ensure UTF-8 output on Windows
+    import io
+    out = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    if args.output == "jsonl":
+        for row in rows:
+            out.write(json.dumps(row, ensure_ascii=False))
+            out.write("\n")
+    else:
+        with RecordWriter(out, args.output) as writer:
+            writer.write_all(rows)
+        out.write("\n")
+    out.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
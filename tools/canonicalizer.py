@@ -12,11 +12,13 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import io
 import sys
 import unicodedata
-from typing import Any, Dict, List
+from functools import lru_cache
+from typing import IO, Any, Callable, Dict, Iterable, List, Optional, Tuple
 
-from validator import parse_sld, parse_mld, detect_header, ESC, FIELD_SEP, REC_SEP_SLD
+from validator import parse_sld, parse_mld, detect_header, escape_text, ESC, FIELD_SEP, REC_SEP_SLD
 
 # Canonicalization rules (v2.0 profile):
 # - Stable key ordering (lexicographic)
@@ -28,17 +30,17 @@ from validator import parse_sld, parse_mld, detect_header, ESC, FIELD_SEP, REC_S
 # - Arrays encoded with '{' elements joined by '~' and closed with '}'
 # - Records separated by '~' for SLD; newline for MLD
 
+# The record encoder cache and RecordWriter follow those of
+# implementations/python/sld.py, with the same sizes (see there).
+ENCODER_CACHE_SIZE = 256
+DEFAULT_FLUSH_SIZE = 64 * 1024
 
-def escape_scalar(value: str) -> str:
-    # Escape special characters and caret
-    return (value
-            .replace('^', '^^')
-            .replace(';', '^;')
-            .replace('~', '^~')
-            .replace('[', '^[')
-            .replace('{', '^{')
-            .replace('}', '^}')
-            )
+# AsyncRecordWriter awaits drain() after this many bytes reach the transport
+DEFAULT_DRAIN_SIZE = 256 * 1024
+
+
+# Escape special characters and caret (validator's escape engine)
+escape_scalar = escape_text
 
 
 def encode_value(key: str, value: Any) -> str:
@@ -53,30 +55,70 @@ def encode_value(key: str, value: Any) -> str:
         # Use plain representation (could refine)
         return f"{key}!f[{value}"
     if isinstance(value, list):
-        elems = []
-        for elem in value:
-            if elem is None:
-                elems.append('!n[')  # typed null for array elements
-            elif isinstance(elem, bool):
-                elems.append(f"!b[{1 if elem else 0}")
-            elif isinstance(elem, int) and not isinstance(elem, bool):
-                elems.append(f"!i[{elem}")
-            elif isinstance(elem, float):
-                elems.append(f"!f[{elem}")
-            else:
-                s = unicodedata.normalize('NFC', str(elem))
-                elems.append(escape_scalar(s))
-        return f"{key}{{{'~'.join(elems)}}}"  # no trailing ~
+        return f"{key}{encode_array(value)}"
     # fallback string
     s = unicodedata.normalize('NFC', str(value))
-    return f"{key}[{escape_scalar(s)}"
+    return f"{key}[{escape_text(s)}"
+
+
+def encode_array(value: List[Any]) -> str:
+    elems = []
+    for elem in value:
+        if type(elem) is str:
+            elems.append(escape_text(elem if elem.isascii() else unicodedata.normalize('NFC', elem)))
+        elif elem is None:
+            elems.append('!n[')  # typed null for array elements
+        elif isinstance(elem, bool):
+            elems.append(f"!b[{1 if elem else 0}")
+        elif isinstance(elem, int) and not isinstance(elem, bool):
+            elems.append(f"!i[{elem}")
+        elif isinstance(elem, float):
+            elems.append(f"!f[{elem}")
+        else:
+            s = unicodedata.normalize('NFC', str(elem))
+            elems.append(escape_text(s))
+    return f"{{{'~'.join(elems)}}}"  # no trailing ~
 
 
 def encode_record(rec: Dict[str, Any]) -> str:
-    parts: List[str] = []
-    for k, v in sorted(rec.items(), key=lambda kv: kv[0]):
-        parts.append(encode_value(k, v))
-    return ';'.join(parts)
+    # Records with the same str keys share one compiled encoder; other keys
+    # would collide in the cache (1 == 1.0 == True), so they are not cached
+    keys = tuple(rec)
+    if all(type(k) is str for k in keys):
+        return _record_encoder(keys)(rec)
+    return ';'.join(encode_value(k, rec[k]) for k in sorted(keys))
+
+
+@lru_cache(maxsize=ENCODER_CACHE_SIZE)
+def _record_encoder(keys: Tuple[str, ...]) -> Callable[[Dict[str, Any]], str]:
+    # Sorted order and the typed key prefixes are computed once per schema;
+    # values of the common exact types skip the isinstance cascade.
+    fields = [(k, f"{k}[", f"{k}!i[", f"{k}!f[", f"{k}!n[", f"{k}!b[1", f"{k}!b[0", f"{k}")
+              for k in sorted(keys)]
+    normalize = unicodedata.normalize
+
+    def encode(rec: Dict[str, Any]) -> str:
+        parts: List[str] = []
+        for k, p_str, p_int, p_float, null_field, true_field, false_field, p_arr in fields:
+            v = rec[k]
+            t = type(v)
+            if t is str:
+                parts.append(p_str + escape_text(v if v.isascii() else normalize('NFC', v)))
+            elif t is int:
+                parts.append(f"{p_int}{v}")
+            elif t is float:
+                parts.append(f"{p_float}{v}")
+            elif v is None:
+                parts.append(null_field)
+            elif t is bool:
+                parts.append(true_field if v else false_field)
+            elif t is list:
+                parts.append(p_arr + encode_array(v))
+            else:
+                parts.append(encode_value(k, v))
+        return ';'.join(parts)
+
+    return encode
 
 
 def encode_header(header: Dict[str, Any]) -> str:
@@ -88,6 +130,148 @@ def encode_header(header: Dict[str, Any]) -> str:
     return ';'.join(parts)
 
 
+class RecordWriter:
+    """Stream canonical records to a text or binary file-like sink.
+
+    Framing matches canonicalize_sld/canonicalize_mld: in SLD every record
+    is followed by '~', in MLD records are separated by newlines. Output is
+    buffered and handed to the sink every flush_size characters. This is
+    sld.SLDWriter/MLDWriter with the canonical encoder; the tools keep their
+    own copy for the reason given at the escape engine in validator.py.
+    """
+
+    def __init__(self, sink: IO, fmt: str = 'sld', header: Optional[Dict[str, Any]] = None,
+                 flush_size: int = DEFAULT_FLUSH_SIZE, encoding: str = 'utf-8'):
+        if fmt not in ('sld', 'mld'):
+            raise ValueError(f"Unknown format: {fmt}")
+        self.sink = sink
+        self.fmt = fmt
+        self.flush_size = flush_size
+        self.encoding = encoding
+        self.count = 0
+        self._binary = (isinstance(sink, (io.RawIOBase, io.BufferedIOBase))
+                        or 'b' in getattr(sink, 'mode', ''))
+        self._buffer: List[str] = []
+        self._buffered = 0
+        self._started = False
+        self._closed = False
+        if header:
+            self._emit(encode_header(header))
+
+    def write(self, rec: Dict[str, Any]) -> None:
+        if self._closed:
+            raise ValueError("write to closed writer")
+        self._emit(encode_record(rec))
+        self.count += 1
+
+    def write_all(self, records: Iterable[Dict[str, Any]]) -> int:
+        written = 0
+        for rec in records:
+            self.write(rec)
+            written += 1
+        return written
+
+    def flush(self) -> None:
+        if not self._buffer:
+            return
+        chunk = ''.join(self._buffer)
+        self._buffer = []
+        self._buffered = 0
+        self._write(chunk)
+
+    def close(self) -> None:
+        # Flushes pending output; the sink itself is left open
+        if self._closed:
+            return
+        if self.fmt == 'sld' and not self._started:
+            self._append(REC_SEP_SLD)
+        self.flush()
+        self._closed = True
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, exc_type, exc, tb):
+        self.close()
+
+    def _emit(self, encoded: str) -> None:
+        if self.fmt == 'sld':
+            self._append(encoded + REC_SEP_SLD)
+        elif self._started:
+            self._append('\n' + encoded)
+        else:
+            self._append(encoded)
+        self._started = True
+
+    def _write(self, chunk: str) -> None:
+        self.sink.write(chunk.encode(self.encoding) if self._binary else chunk)
+
+    def _append(self, text: str) -> None:
+        self._buffer.append(text)
+        self._buffered += len(text)
+        if self._buffered >= self.flush_size:
+            self.flush()
+
+
+class AsyncRecordWriter(RecordWriter):
+    """RecordWriter for an asyncio.StreamWriter, with backpressure.
+
+    write() encodes into the buffer as RecordWriter does; every flush hands
+    the encoded bytes to the transport. The awrite* coroutines then await
+    stream.drain() once drain_size bytes went out since the last drain, so
+    a slow peer pauses the producer instead of growing the transport
+    buffer. Output is identical to RecordWriter's.
+    """
+
+    def __init__(self, stream: Any, fmt: str = 'sld', header: Optional[Dict[str, Any]] = None,
+                 flush_size: int = DEFAULT_FLUSH_SIZE, drain_size: int = DEFAULT_DRAIN_SIZE,
+                 encoding: str = 'utf-8'):
+        self.drain_size = drain_size
+        self._undrained = 0
+        super().__init__(stream, fmt, header, flush_size, encoding)
+
+    def _write(self, chunk: str) -> None:
+        data = chunk.encode(self.encoding)
+        self.sink.write(data)
+        self._undrained += len(data)
+
+    async def drain(self) -> None:
+        """Flush the buffer and wait until the stream accepts more data."""
+        self.flush()
+        self._undrained = 0
+        await self.sink.drain()
+
+    async def awrite(self, rec: Dict[str, Any]) -> None:
+        self.write(rec)
+        if self._undrained >= self.drain_size:
+            await self.drain()
+
+    async def awrite_all(self, records: Any) -> int:
+        """Write every record of an async or plain iterable."""
+        written = 0
+        if hasattr(records, '__aiter__'):
+            async for rec in records:
+                await self.awrite(rec)
+                written += 1
+        else:
+            for rec in records:
+                await self.awrite(rec)
+                written += 1
+        return written
+
+    async def aclose(self) -> None:
+        # close() without draining would leave the tail in the transport
+        self.close()
+        self._undrained = 0
+        await self.sink.drain()
+
+    async def __aenter__(self):
+        return self
+
+    async def __aexit__(self, exc_type, exc, tb):
+        await self.aclose()
+
+
 def canonicalize_sld(text: str) -> str:
     records = parse_sld(text)
     header, body = detect_header(records)
@@ -16,16 +16,18 @@
 """
 SLD/MLD/JSON converter supporting bidirectional transformations:
 - JSON → SLD/MLD (with optional v2.0 typing)
-- SLD/MLD → JSON
+- JSON Lines → SLD/MLD/JSON, streamed record by record
+- SLD/MLD → JSON or JSON Lines, streamed record by record
 - SLD ↔ MLD
 """
+import io
 import json
 import sys
 import unicodedata
-from typing import Any, Dict, List, Optional
+from typing import IO, Any, Dict, Iterator, List, Optional
 
-from validator import parse_sld, parse_mld, detect_header
-from canonicalizer import encode_record, encode_header, escape_scalar
+from validator import iter_detect_header, iter_parse_file, parse_file, detect_header, write_json
+from canonicalizer import RecordWriter, encode_record, encode_header, escape_scalar
 
 
 def json_to_records(data: Any) -> tuple[Optional[Dict], List[Dict]]:
@@ -87,36 +89,81 @@ def json_to_mld(json_path: str, typed: bool = False) -> str:
     return '\n'.join(lines)
 
 
-def sld_to_json(sld_path: str) -> str:
-    """Convert SLD file to JSON."""
-    with open(sld_path, 'r', encoding='utf-8') as f:
-        data = f.read()
+def iter_jsonl(f: IO) -> Iterator[Dict]:
+    """Yield the objects of a JSON Lines stream, one line at a time.
 
-    records = parse_sld(data)
-    header, body = detect_header(records)
-    result = records_to_json(header, body)
+    Blank lines are skipped; a line that is not a JSON object raises
+    ValueError with its line number.
+    """
+    for number, line in enumerate(f, 1):
+        if not line.strip():
+            continue
+        try:
+            rec = json.loads(line)
+        except ValueError as e:
+            raise ValueError(f"line {number}: {e}") from None
+        if not isinstance(rec, dict):
+            raise ValueError(f"line {number}: expected a JSON object")
+        yield rec
 
-    return json.dumps(result, ensure_ascii=False, indent=2)
 
+def stream_from_jsonl(jsonl_path: str, fmt: str, out: IO) -> int:
+    """Stream a JSON Lines file to out as SLD/MLD (fmt) or JSON/JSON Lines.
 
-def mld_to_json(mld_path: str) -> str:
-    """Convert MLD file to JSON."""
-    with open(mld_path, 'r', encoding='utf-8') as f:
-        data = f.read()
+    A first line whose keys all start with '!' is the header, as in
+    validator.detect_header. Records are encoded one at a time through a
+    buffered RecordWriter (write_json for 'json' / 'jsonl'). Returns the
+    number of records written.
+    """
+    with open(jsonl_path, 'r', encoding='utf-8') as f:
+        header, records = iter_detect_header(iter_jsonl(f))
+        if fmt in ('json', 'jsonl'):
+            return write_json(out, header, records, fmt == 'jsonl')
+        with RecordWriter(out, fmt, header) as writer:
+            return writer.write_all(records)
 
-    records = parse_mld(data)
-    header, body = detect_header(records)
-    result = records_to_json(header, body)
 
-    return json.dumps(result, ensure_ascii=False, indent=2)
+def jsonl_to_sld(jsonl_path: str) -> str:
+    """Convert JSON Lines file to SLD format."""
+    out = io.StringIO()
+    stream_from_jsonl(jsonl_path, 'sld', out)
+    return out.getvalue()
+
+
+def jsonl_to_mld(jsonl_path: str) -> str:
+    """Convert JSON Lines file to MLD format."""
+    out = io.StringIO()
+    stream_from_jsonl(jsonl_path, 'mld', out)
+    return out.getvalue()
+
+
+def stream_to_json(path: str, fmt: str, out: IO, lines: bool = False) -> int:
+    """Stream an SLD/MLD file to out as JSON (or JSON Lines, lines=True).
+
+    Records are decoded and written one at a time, see validator.write_json.
+    Returns the number of records written.
+    """
+    header, body = iter_detect_header(iter_parse_file(path, fmt))
+    return write_json(out, header, body, lines)
+
+
+def sld_to_json(sld_path: str, lines: bool = False) -> str:
+    """Convert SLD file to JSON."""
+    out = io.StringIO()
+    stream_to_json(sld_path, 'sld', out, lines)
+    return out.getvalue()
+
+
+def mld_to_json(mld_path: str, lines: bool = False) -> str:
+    """Convert MLD file to JSON."""
+    out = io.StringIO()
+    stream_to_json(mld_path, 'mld', out, lines)
+    return out.getvalue()
 
 
 def sld_to_mld(sld_path: str) -> str:
     """Convert SLD to MLD (preserving structure)."""
-    with open(sld_path, 'r', encoding='utf-8') as f:
-        data = f.read()
-
-    records = parse_sld(data)
+    records = parse_file(sld_path, 'sld')
     header, body = detect_header(records)
     lines: List[str] = []
 
@@ -131,10 +178,7 @@ def sld_to_mld(sld_path: str) -> str:
 
 def mld_to_sld(mld_path: str) -> str:
     """Convert MLD to SLD (preserving structure)."""
-    with open(mld_path, 'r', encoding='utf-8') as f:
-        data = f.read()
-
-    records = parse_mld(data)
+    records = parse_file(mld_path, 'mld')
     header, body = detect_header(records)
     parts: List[str] = []
 
@@ -155,33 +199,64 @@ def main(argv: List[str]) -> int:
         epilog='Examples:\n'
                '  convert.py --from json --to sld data.json\n'
                '  convert.py --from sld --to json data.sld\n'
+               '  convert.py --from mld --to jsonl data.mld -o data.jsonl\n'
+               '  convert.py --from jsonl --to mld export.jsonl -o export.mld\n'
                '  convert.py --from sld --to mld data.sld\n',
         formatter_class=argparse.RawDescriptionHelpFormatter
     )
     p.add_argument('input', help='Input file path')
     p.add_argument('--from', dest='from_format', required=True,
-                   choices=['json', 'sld', 'mld'],
-                   help='Source format')
+                   choices=['json', 'jsonl', 'sld', 'mld'],
+                   help='Source format (jsonl: JSON Lines, optional header on the first line)')
     p.add_argument('--to', dest='to_format', required=True,
-                   choices=['json', 'sld', 'mld'],
-                   help='Target format')
+                   choices=['json', 'jsonl', 'sld', 'mld'],
+                   help='Target format (jsonl: JSON Lines, header first if present)')
     p.add_argument('--typed', action='store_true',
                    help='Use v2.0 inline type tags (only for JSON→SLD/MLD)')
     p.add_argument('-o', '--output', help='Output file (default: stdout)')
 
     args = p.parse_args(argv)
 
+    # SLD/MLD → JSON is streamed straight to the output
+    if args.from_format in ('sld', 'mld') and args.to_format in ('json', 'jsonl'):
+        lines = args.to_format == 'jsonl'
+        if args.output:
+            with open(args.output, 'w', encoding='utf-8') as f:
+                stream_to_json(args.input, args.from_format, f, lines)
+        else:
+            stream_to_json(args.input, args.from_format, sys.stdout, lines)
+        return 0
+
+    # JSON Lines input is streamed straight to the output
+    if args.from_format == 'jsonl':
+        try:
+            if args.output:
+                with open(args.output, 'w', encoding='utf-8') as f:
+                    stream_from_jsonl(args.input, args.to_format, f)
+                    if args.to_format in ('sld', 'mld'):
+                        f.write('\n')
+            else:
+                stream_from_jsonl(args.input, args.to_format, sys.stdout)
+                if args.to_format in ('sld', 'mld'):
+                    sys.stdout.write('\n')
+        except ValueError as e:
+            sys.stderr.write(f"Invalid JSON Lines input: {e}\n")
+            return 1
+        return 0
+
     # Route conversion
     result = None
 
-    if args.from_format == 'json' and args.to_format == 'sld':
+    if args.from_format == 'json' and args.to_format == 'jsonl':
+        with open(args.input, 'r', encoding='utf-8') as f:
+            header, records = json_to_records(json.load(f))
+        out = io.StringIO()
+        write_json(out, header, records, lines=True)
+        result = out.getvalue()
+    elif args.from_format == 'json' and args.to_format == 'sld':
         result = json_to_sld(args.input, args.typed)
     elif args.from_format == 'json' and args.to_format == 'mld':
         result = json_to_mld(args.input, args.typed)
-    elif args.from_format == 'sld' and args.to_format == 'json':
-        result = sld_to_json(args.input)
-    elif args.from_format == 'mld' and args.to_format == 'json':
-        result = mld_to_json(args.input)
     elif args.from_format == 'sld' and args.to_format == 'mld':
         result = sld_to_mld(args.input)
     elif args.from_format == 'mld' and args.to_format == 'sld':
@@ -0,0 +1,504 @@
+#!/usr/bin/env python3
+# Copyright 2025 Alfredo Pinto Molina
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Random-access record and key indexes for SLD/MLD files:
+- build_index(path) records the byte span of every record (escape-aware for SLD)
+- build_key_index(path, field) maps the values of one field to record spans
+- Both are kept in sidecar files tied to the file's size, mtime and a
+  fingerprint of its indexed bytes, and are brought up to date incrementally
+  when records are appended (a file rewritten in place is indexed again)
+- RecordTable reads records by position, slice or field value, decoding only
+  those records
+"""
+import hashlib
+import json
+import math
+import os
+import struct
+import sys
+from array import array
+from bisect import bisect_left, bisect_right
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+from urllib.parse import quote
+
+from validator import byte_spans, decode_record, file_format, map_file, parse_record
+
+INDEX_SUFFIX = ".idx"
+KEY_INDEX_SUFFIX = ".kidx"
+
+# Sidecar layout: header, then count (start, stop) pairs as little-endian int64
+_INDEX_MAGIC = b"SLDIDX02"
+_INDEX_HEADER = struct.Struct("<8s4sqq16sq")  # magic, format, size, mtime_ns, fingerprint, count
+
+# Key index sidecar: header, JSON {"field", "values"}, then the spans as above
+_KEY_INDEX_MAGIC = b"SLDKEY02"
+_KEY_INDEX_HEADER = struct.Struct("<8s4sqq16sqqq")  # ..., resume, count, JSON length
+
+# Bytes hashed at each end of the indexed part of a file; an index is only
+# extended in place when they are unchanged
+_FINGERPRINT_SPAN = 4096
+
+# Records decoded per block when iterating a table
+_ITER_BLOCK = 1024
+
+
+class RecordIndex:
+    """Byte spans of the records of one file, in parse order.
+
+    spans holds start, stop offsets for record 0, then record 1, and so on;
+    record i is spans[2*i]:spans[2*i+1]. size, mtime_ns and fingerprint
+    describe the file the spans were taken from.
+    """
+
+    __slots__ = ("fmt", "size", "mtime_ns", "fingerprint", "spans")
+
+    def __init__(self, fmt: str, size: int, mtime_ns: int, fingerprint: bytes, spans: array):
+        self.fmt = fmt
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.fingerprint = fingerprint
+        self.spans = spans
+
+    def __len__(self) -> int:
+        return len(self.spans) // 2
+
+    def span(self, i: int) -> Tuple[int, int]:
+        return self.spans[2 * i], self.spans[2 * i + 1]
+
+    def is_current(self, path: str) -> bool:
+        st = os.stat(path)
+        return st.st_size == self.size and st.st_mtime_ns == self.mtime_ns
+
+    def save(self, index_path: str) -> None:
+        spans = array("q", self.spans)
+        if sys.byteorder == "big":
+            spans.byteswap()
+        with open(index_path, "wb") as f:
+            f.write(_INDEX_HEADER.pack(_INDEX_MAGIC, self.fmt.encode("ascii"), self.size,
+                                       self.mtime_ns, self.fingerprint, len(self)))
+            spans.tofile(f)
+
+    @classmethod
+    def load(cls, index_path: str) -> "RecordIndex":
+        with open(index_path, "rb") as f:
+            head = f.read(_INDEX_HEADER.size)
+            if len(head) != _INDEX_HEADER.size:
+                raise ValueError(f"{index_path}: truncated index")
+            magic, fmt, size, mtime_ns, fingerprint, count = _INDEX_HEADER.unpack(head)
+            if magic != _INDEX_MAGIC:
+                raise ValueError(f"{index_path}: not a record index")
+            spans = array("q")
+            try:
+                spans.fromfile(f, 2 * count)
+            except EOFError:
+                raise ValueError(f"{index_path}: truncated index") from None
+        if sys.byteorder == "big":
+            spans.byteswap()
+        return cls(fmt.rstrip(b"\0").decode("ascii"), size, mtime_ns, fingerprint, spans)
+
+
+def _fingerprint(path: str, size: int) -> bytes:
+    # Hash of the first and last _FINGERPRINT_SPAN bytes of path[:size]
+    digest = hashlib.blake2b(digest_size=16)
+    with open(path, "rb") as f:
+        digest.update(f.read(min(size, _FINGERPRINT_SPAN)))
+        if size > _FINGERPRINT_SPAN:
+            f.seek(max(_FINGERPRINT_SPAN, size - _FINGERPRINT_SPAN))
+            digest.update(f.read(size - f.tell()))
+    return digest.digest()
+
+
+def _is_append(path: str, st: os.stat_result, size: int, fingerprint: bytes) -> bool:
+    # True when path still starts with the size bytes an index was built from
+    return st.st_size >= size and _fingerprint(path, size) == fingerprint
+
+
+def _scan(path: str, fmt: str, begin: int = 0) -> Iterator[Tuple[int, int, str]]:
+    # (start, stop, text) of the records from byte offset begin on
+    with map_file(path) as buf:
+        yield from byte_spans(buf, fmt, begin)
+
+
+def build_index(path: str, fmt: Optional[str] = None) -> RecordIndex:
+    """Scan a file once and return the span of every record.
+
+    fmt defaults to the validator CLI's detection. Indexes match the list
+    parse_sld/parse_mld return, so a header record, if any, is record 0.
+    """
+    st = os.stat(path)
+    fmt = fmt or file_format(path)
+    spans = array("q")
+    for start, stop, _ in _scan(path, fmt):
+        spans.append(start)
+        spans.append(stop)
+    return RecordIndex(fmt, st.st_size, st.st_mtime_ns, _fingerprint(path, st.st_size), spans)
+
+
+def update_index(index: RecordIndex, path: str) -> RecordIndex:
+    """Extend an index after records were appended to path.
+
+    The last indexed record is scanned again, since appended text may
+    continue it. A file that shrank, or whose indexed bytes no longer match
+    the fingerprint, is indexed from scratch.
+    """
+    st = os.stat(path)
+    if not _is_append(path, st, index.size, index.fingerprint):
+        return build_index(path, index.fmt)
+    spans = array("q", index.spans)
+    begin = 0
+    if spans:
+        begin = spans[-2]
+        del spans[-2:]
+    for start, stop, _ in _scan(path, index.fmt, begin):
+        spans.append(start)
+        spans.append(stop)
+    return RecordIndex(index.fmt, st.st_size, st.st_mtime_ns, _fingerprint(path, st.st_size), spans)
+
+
+def open_index(path: str, fmt: Optional[str] = None, index_path: Optional[str] = None) -> RecordIndex:
+    """Load the sidecar index of path, updating or rebuilding it when stale."""
+    index_path = index_path or path + INDEX_SUFFIX
+    index = None
+    if os.path.exists(index_path):
+        try:
+            index = RecordIndex.load(index_path)
+        except ValueError:
+            index = None
+        if index is not None and fmt not in (None, index.fmt):
+            index = None
+    if index is not None and index.is_current(path):
+        return index
+    index = update_index(index, path) if index is not None else build_index(path, fmt)
+    index.save(index_path)
+    return index
+
+
+def index_key(value: Any) -> Optional[Tuple[int, Any]]:
+    """Sort key of an indexable value: bools, then numbers, then strings.
+
+    Nulls, arrays and NaN are not indexed and return None.
+    """
+    if isinstance(value, bool):
+        return (0, value)
+    if isinstance(value, (int, float)):
+        if isinstance(value, float) and math.isnan(value):
+            return None
+        return (1, value)
+    if isinstance(value, str):
+        return (2, value)
+    return None
+
+
+class KeyIndex:
+    """Values of one field, sorted, with the span of the record holding each.
+
+    keys[i] is (rank, value) as built by index_key, so values of different
+    types sort apart; its record is spans[2*i]:spans[2*i+1]. Equal values
+    keep file order. resume is the start of the last record scanned, where
+    scanning continues once records are appended.
+    """
+
+    __slots__ = ("field", "fmt", "size", "mtime_ns", "fingerprint", "resume", "keys", "spans")
+
+    def __init__(self, field: str, fmt: str, size: int, mtime_ns: int, fingerprint: bytes,
+                 resume: int, keys: List[Tuple[int, Any]], spans: array):
+        self.field = field
+        self.fmt = fmt
+        self.size = size
+        self.mtime_ns = mtime_ns
+        self.fingerprint = fingerprint
+        self.resume = resume
+        self.keys = keys
+        self.spans = spans
+
+    def __len__(self) -> int:
+        return len(self.keys)
+
+    def _spans(self, lo: int, hi: int) -> List[Tuple[int, int]]:
+        spans = self.spans
+        return [(spans[2 * i], spans[2 * i + 1]) for i in range(lo, hi)]
+
+    def find(self, value: Any) -> List[Tuple[int, int]]:
+        """Spans of the records whose field equals value, in file order."""
+        key = index_key(value)
+        if key is None:
+            return []
+        return self._spans(bisect_left(self.keys, key), bisect_right(self.keys, key))
+
+    def find_range(self, lo: Any = None, hi: Any = None) -> List[Tuple[int, int]]:
+        """Spans of the records with lo <= value < hi, in value order.
+
+        Either bound may be None for an open end; the other bound's type
+        (bool, number or string) then limits the range.
+        """
+        lo_key = index_key(lo) if lo is not None else None
+        hi_key = index_key(hi) if hi is not None else None
+        if (lo is not None and lo_key is None) or (hi is not None and hi_key is None):
+            raise ValueError("range bounds must be bools, numbers or strings")
+        if lo_key is None and hi_key is None:
+            return self._spans(0, len(self.keys))
+        start = bisect_left(self.keys, lo_key if lo_key else (hi_key[0],))
+        stop = bisect_left(self.keys, hi_key if hi_key else (lo_key[0] + 1,))
+        return self._spans(start, max(start, stop))
+
+    def is_current(self, path: str) -> bool:
+        st = os.stat(path)
+        return st.st_size == self.size and st.st_mtime_ns == self.mtime_ns
+
+    def save(self, index_path: str) -> None:
+        meta = json.dumps({"field": self.field, "values": [v for _, v in self.keys]},
+                          ensure_ascii=False).encode("utf-8")
+        spans = array("q", self.spans)
+        if sys.byteorder == "big":
+            spans.byteswap()
+        with open(index_path, "wb") as f:
+            f.write(_KEY_INDEX_HEADER.pack(_KEY_INDEX_MAGIC, self.fmt.encode("ascii"), self.size,
+                                           self.mtime_ns, self.fingerprint, self.resume, len(self),
+                                           len(meta)))
+            f.write(meta)
+            spans.tofile(f)
+
+    @classmethod
+    def load(cls, index_path: str) -> "KeyIndex":
+        with open(index_path, "rb") as f:
+            head = f.read(_KEY_INDEX_HEADER.size)
+            if len(head) != _KEY_INDEX_HEADER.size:
+                raise ValueError(f"{index_path}: truncated index")
+            (magic, fmt, size, mtime_ns, fingerprint, resume, count,
+             meta_len) = _KEY_INDEX_HEADER.unpack(head)
+            if magic != _KEY_INDEX_MAGIC:
+                raise ValueError(f"{index_path}: not a key index")
+            meta = json.loads(f.read(meta_len).decode("utf-8"))
+            spans = array("q")
+            try:
+                spans.fromfile(f, 2 * count)
+            except EOFError:
+                raise ValueError(f"{index_path}: truncated index") from None
+        if sys.byteorder == "big":
+            spans.byteswap()
+        keys = [index_key(v) for v in meta["values"]]
+        return cls(meta["field"], fmt.rstrip(b"\0").decode("ascii"), size, mtime_ns, fingerprint,
+                   resume, keys, spans)
+
+
+def _key_entries(path: str, fmt: str, field: str, begin: int,
+                 entries: List[Tuple[Tuple[int, Any], int, int]]) -> int:
+    # Append (key, start, stop) for records from begin on; returns the new resume offset
+    resume = begin
+    for start, stop, text in _scan(path, fmt, begin):
+        resume = start
+        key = index_key(parse_record(text).get(field))
+        if key is not None:
+            entries.append((key, start, stop))
+    return resume
+
+
+def _key_index(path: str, field: str, fmt: str, st: os.stat_result, resume: int,
+               entries: List[Tuple[Tuple[int, Any], int, int]]) -> KeyIndex:
+    entries.sort(key=lambda e: e[0])  # stable: equal values stay in file order
+    spans = array("q")
+    for _, start, stop in entries:
+        spans.append(start)
+        spans.append(stop)
+    return KeyIndex(field, fmt, st.st_size, st.st_mtime_ns, _fingerprint(path, st.st_size), resume,
+                    [e[0] for e in entries], spans)
+
+
+def build_key_index(path: str, field: str, fmt: Optional[str] = None) -> KeyIndex:
+    """Scan a file once and index the values of field.
+
+    Records without the field, or whose value is null, an array or NaN,
+    are left out.
+    """
+    st = os.stat(path)
+    fmt = fmt or file_format(path)
+    entries: List[Tuple[Tuple[int, Any], int, int]] = []
+    resume = _key_entries(path, fmt, field, 0, entries)
+    return _key_index(path, field, fmt, st, resume, entries)
+
+
+def update_key_index(index: KeyIndex, path: str) -> KeyIndex:
+    """Add the records appended to path since index was built.
+
+    Entries from the last scanned record on are dropped and scanned again;
+    a file that shrank, or whose indexed bytes no longer match the
+    fingerprint, is indexed from scratch.
+    """
+    st = os.stat(path)
+    if not _is_append(path, st, index.size, index.fingerprint):
+        return build_key_index(path, index.field, index.fmt)
+    spans = index.spans
+    entries = [(key, spans[2 * i], spans[2 * i + 1]) for i, key in enumerate(index.keys)
+               if spans[2 * i] < index.resume]
+    resume = _key_entries(path, index.fmt, index.field, index.resume, entries)
+    return _key_index(path, index.field, index.fmt, st, resume, entries)
+
+
+def key_index_path(path: str, field: str) -> str:
+    """Default sidecar of the key index of field: <file>.<field>.kidx"""
+    return f"{path}.{quote(field, safe='')}{KEY_INDEX_SUFFIX}"
+
+
+def open_key_index(path: str, field: str, fmt: Optional[str] = None,
+                   index_path: Optional[str] = None) -> KeyIndex:
+    """Load the key index of field, updating or rebuilding it when stale."""
+    index_path = index_path or key_index_path(path, field)
+    index = None
+    if os.path.exists(index_path):
+        try:
+            index = KeyIndex.load(index_path)
+        except ValueError:
+            index = None
+        if index is not None and (index.field != field or fmt not in (None, index.fmt)):
+            index = None
+    if index is not None and index.is_current(path):
+        return index
+    index = update_key_index(index, path) if index is not None else build_key_index(path, field, fmt)
+    index.save(index_path)
+    return index
+
+
+class RecordTable:
+    """Read-only sequence view of an SLD/MLD file backed by its record index.
+
+    len(table), table[i] and table[a:b] seek to the indexed offsets and
+    decode only the requested records; table[i] is the same dict as
+    parse_sld/parse_mld(text)[i]. The index is checked against the file when
+    the table is opened.
+    """
+
+    def __init__(self, path: str, fmt: Optional[str] = None, index_path: Optional[str] = None):
+        self.path = path
+        self.index = open_index(path, fmt, index_path)
+        self.fmt = self.index.fmt
+        self._keys: Dict[str, KeyIndex] = {}
+        self._f = open(path, "rb")
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def __getitem__(self, i: Any) -> Any:
+        if isinstance(i, slice):
+            return self._read_range(range(*i.indices(len(self))))
+        n = len(self)
+        if i < 0:
+            i += n
+        if not 0 <= i < n:
+            raise IndexError("record index out of range")
+        return self._read_spans([self.index.span(i)])[0]
+
+    def __iter__(self) -> Iterator[Dict[str, Any]]:
+        for first in range(0, len(self), _ITER_BLOCK):
+            yield from self._read_range(range(first, min(first + _ITER_BLOCK, len(self))))
+
+    def key_index(self, field: str) -> KeyIndex:
+        """The key index of field, loaded (or built) on first use."""
+        index = self._keys.get(field)
+        if index is None:
+            index = self._keys[field] = open_key_index(self.path, field, self.fmt)
+        return index
+
+    def find(self, field: str, value: Any) -> List[Dict[str, Any]]:
+        """Records whose field equals value, in file order."""
+        return self._read_spans(self.key_index(field).find(value))
+
+    def find_range(self, field: str, lo: Any = None, hi: Any = None) -> List[Dict[str, Any]]:
+        """Records with lo <= field < hi, ordered by value; see KeyIndex.find_range."""
+        return self._read_spans(self.key_index(field).find_range(lo, hi))
+
+    def _read_spans(self, spans: List[Tuple[int, int]]) -> List[Dict[str, Any]]:
+        out: List[Dict[str, Any]] = []
+        for start, stop in spans:
+            self._f.seek(start)
+            out.append(parse_record(decode_record(self._f.read(stop - start), self.fmt)))
+        return out
+
+    def _read_range(self, rows: range) -> List[Dict[str, Any]]:
+        if not rows:
+            return []
+        if rows.step != 1:
+            return self._read_spans([self.index.span(j) for j in rows])
+        # consecutive records: one read covering all of them
+        spans = self.index.spans
+        base = spans[2 * rows.start]
+        self._f.seek(base)
+        data = self._f.read(spans[2 * rows.stop - 1] - base)
+        out: List[Dict[str, Any]] = []
+        for j in rows:
+            out.append(parse_record(decode_record(data[spans[2 * j] - base:spans[2 * j + 1] - base], self.fmt)))
+        return out
+
+    def close(self) -> None:
+        self._f.close()
+
+    def __enter__(self) -> "RecordTable":
+        return self
+
+    def __exit__(self, *exc: Any) -> None:
+        self.close()
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    p = argparse.ArgumentParser(description="Build or query the record index of an SLD/MLD file")
+    p.add_argument("file", help="Input file (.sld or .mld)")
+    p.add_argument("--format", choices=["sld", "mld"], help="Force input format detection")
+    p.add_argument("--index", help=f"Index file (default: <file>{INDEX_SUFFIX})")
+    p.add_argument("--records", metavar="START[:STOP]",
+                   help="Print these records as JSON instead of the record count")
+    p.add_argument("--key", metavar="FIELD", help="Build or update the key index of FIELD")
+    p.add_argument("--find", metavar="VALUE",
+                   help="Print records whose --key field equals VALUE (JSON literal or plain string)")
+    p.add_argument("--range", metavar="LO:HI",
+                   help="Print records with LO <= --key field < HI; either end may be empty")
+    args = p.parse_args(argv)
+    if (args.find is not None or args.range is not None) and not args.key:
+        p.error("--find and --range need --key")
+
+    def literal(text: str) -> Any:
+        try:
+            return json.loads(text)
+        except ValueError:
+            return text
+
+    with RecordTable(args.file, args.format, args.index) as table:
+        if args.find is not None:
+            out = table.find(args.key, literal(args.find))
+        elif args.range is not None:
+            lo, _, hi = args.range.partition(":")
+            out = table.find_range(args.key, literal(lo) if lo else None, literal(hi) if hi else None)
+        elif args.records is not None:
+            start, sep, stop = args.records.partition(":")
+            if sep:
+                out = table[int(start) if start else None:int(stop) if stop else None]
+            else:
+                out = table[int(start)]
+        else:
+            if args.key:
+                print(f"{len(table.key_index(args.key))} values of {args.key}")
+            print(f"{len(table)} records ({table.fmt})")
+            return 0
+    # Ensure UTF-8 output on Windows
+    import io
+    sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    json.dump(out, sys.stdout, ensure_ascii=False, indent=2)
+    sys.stdout.write("\n")
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
@@ -0,0 +1,234 @@
+# Copyright 2025 Alfredo Pinto Molina
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Optional NumPy backend for typed SLD/MLD columns:
+- Decode '!i' / '!f' / '!b' columns into ndarrays (masked arrays when nulls occur)
+- Encode ndarrays, masked arrays and record arrays back to canonical SLD/MLD
+
+Numbers are parsed and formatted by NumPy casts over whole columns instead of
+one int()/float() call per cell. The pure-Python validator stays the default;
+this module is only needed when NumPy output is wanted.
+"""
+import re
+from typing import Any, Dict, List, Mapping, Optional, Tuple
+
+try:
+    import numpy as np
+except ImportError as e:  # NumPy is an optional extra
+    raise ImportError("numpy_backend requires NumPy: pip install numpy") from e
+
+from validator import (
+    FIELD_SCALAR, REC_SEP_MLD, REC_SEP_SLD, field_item, parse_key_and_type, scalar_value, tokenize_records,
+)
+from canonicalizer import encode_header, encode_value
+
+
+# Inline type codes decoded into native arrays
+NUMPY_DTYPES = {"i": np.int64, "f": np.float64, "b": np.bool_}
+
+# A column whose cells all match these (one per line) is cast in one go.
+# Anything else (escapes, underscores, words) goes through _convert_typed.
+_BULK_LITERALS = {
+    "i": re.compile(r"(?:[+-]?[0-9]+\n)*[+-]?[0-9]+"),
+    "f": re.compile(r"(?:[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?\n)*"
+                    r"[+-]?(?:[0-9]+\.?[0-9]*|\.[0-9]+)(?:[eE][+-]?[0-9]+)?"),
+    "b": re.compile(r"(?:[01]\n)*[01]"),
+}
+_PY_TYPES = {"i": int, "f": float, "b": bool}
+
+
+def _cast(tcode: str, raws: List[str]) -> Optional[Any]:
+    # Vectorized parse of clean literals; None when some cell needs the slow path
+    if not _BULK_LITERALS[tcode].fullmatch("\n".join(raws)):
+        return None
+    cells = np.array(raws)
+    if tcode == "b":
+        return cells == "1"
+    try:
+        return cells.astype(NUMPY_DTYPES[tcode])
+    except OverflowError:
+        return None
+
+
+class _Collector:
+    """Cells of one column while a document is scanned.
+
+    Typed columns keep the raw text of each cell and the row it belongs to,
+    so the whole column can be converted at the end. values holds decoded
+    values for untyped columns, and for typed ones once they are demoted.
+    """
+
+    __slots__ = ("tcode", "rows", "raws", "values")
+
+    def __init__(self, tcode: Optional[str]):
+        self.tcode = tcode if tcode in NUMPY_DTYPES else None
+        self.rows: List[int] = []
+        self.raws: List[str] = []
+        self.values: Optional[List[Any]] = None if self.tcode else []
+
+    def add(self, row: int, s: str, field: Tuple[int, int, int, int, Any], tcode: Optional[str]) -> None:
+        if self.values is None:
+            if self.rows and self.rows[-1] == row:
+                # repeated key within one record: the last value wins
+                self.rows.pop()
+                self.raws.pop()
+            _, opener, kind, end, _ = field
+            if kind == FIELD_SCALAR and tcode == self.tcode:
+                self.rows.append(row)
+                self.raws.append(s[opener + 1:end])
+                return
+            value = field_item(s, field)[2]
+            if value is None:
+                return
+            # a value of another type: keep exact values from here on
+            self.values = self._exact_list(row)
+        else:
+            value = field_item(s, field)[2]
+        values = self.values
+        if len(values) > row:
+            values[row] = value
+        else:
+            values.extend([None] * (row - len(values)))
+            values.append(value)
+
+    def finish(self, nrows: int) -> Any:
+        if self.values is not None:
+            self.values.extend([None] * (nrows - len(self.values)))
+            return self.values
+        dtype = NUMPY_DTYPES[self.tcode]
+        values = np.zeros(nrows, dtype=dtype)
+        mask = np.ones(nrows, dtype=np.bool_)
+        rows = np.array(self.rows, dtype=np.intp)
+        parsed = _cast(self.tcode, self.raws) if self.raws else None
+        if parsed is not None:
+            values[rows] = parsed
+            mask[rows] = False
+        elif self.raws:
+            # exact per-cell conversion, as parse_sld would do
+            cells = [scalar_value(raw, self.tcode) for raw in self.raws]
+            kind = _PY_TYPES[self.tcode]
+            if any(v is not None and type(v) is not kind for v in cells):
+                return self._exact_list(nrows, cells)
+            try:
+                values[rows] = np.array([0 if v is None else v for v in cells], dtype=dtype)
+            except OverflowError:
+                return self._exact_list(nrows, cells)
+            mask[rows] = np.array([v is None for v in cells], dtype=np.bool_)
+        if mask.any():
+            return np.ma.MaskedArray(values, mask=mask)
+        return values
+
+    def _exact_list(self, nrows: int, cells: Optional[List[Any]] = None) -> List[Any]:
+        if cells is None:
+            cells = [scalar_value(raw, self.tcode) for raw in self.raws]
+        out: List[Any] = [None] * nrows
+        for row, v in zip(self.rows, cells):
+            out[row] = v
+        return out
+
+
+def parse_columns_numpy(text: str, fmt: str = "sld") -> Tuple[Optional[Dict[str, Any]], Dict[str, Any]]:
+    """NumPy counterpart of validator.parse_columns.
+
+    Returns (header, columns). A key whose values are all '!i', '!f' or '!b'
+    scalars (or nulls) becomes an int64 / float64 / bool ndarray, or a
+    numpy.ma.MaskedArray when some records are null or lack the key. Other
+    keys, and typed keys holding values that do not fit the dtype, are
+    returned as lists equal to pivoting parse_sld/parse_mld output.
+    """
+    s, records = tokenize_records(text, fmt)
+    header: Optional[Dict[str, Any]] = None
+    columns: Dict[str, _Collector] = {}
+    # key head text -> (collector, type code); records repeat the same heads
+    heads: Dict[str, Tuple[_Collector, Optional[str]]] = {}
+    row = 0
+    first = True
+    for fields in records:
+        if first:
+            first = False
+            items = [field_item(s, f) for f in fields]
+            if all(key.startswith("!") for key, _, _ in items):
+                header = {key: value for key, _, value in items}
+                continue
+        for field in fields:
+            head = s[field[0]:field[1]]
+            entry = heads.get(head)
+            if entry is None:
+                key, tcode = parse_key_and_type(head)
+                col = columns.get(key)
+                if col is None:
+                    col = columns[key] = _Collector(tcode)
+                entry = heads[head] = (col, tcode)
+            col, tcode = entry
+            if (col.values is None and field[2] == FIELD_SCALAR and tcode == col.tcode
+                    and (not col.rows or col.rows[-1] != row)):
+                # common case inlined: another typed cell for this column
+                col.rows.append(row)
+                col.raws.append(s[field[1] + 1:field[3]])
+            else:
+                col.add(row, s, field, tcode)
+        row += 1
+    return header, {key: col.finish(row) for key, col in columns.items()}
+
+
+def _format_column(key: str, col: Any) -> List[str]:
+    # Encoded 'key...' field text for every row of one column
+    if isinstance(col, np.ndarray) and col.dtype.kind in "iufb":
+        data = np.ma.getdata(col)
+        mask = np.ma.getmaskarray(col) if np.ma.isMaskedArray(col) else None
+        kind = col.dtype.kind
+        if kind == "b":
+            cells = np.where(data, f"{key}!b[1", f"{key}!b[0")
+        else:
+            tag = "!f[" if kind == "f" else "!i["
+            if kind == "f":
+                data = data.astype(np.float64)
+            cells = np.char.add(f"{key}{tag}", data.astype(str))
+        if mask is not None and mask.any():
+            cells = cells.astype(object)
+            cells[mask] = f"{key}!n["
+        return cells.tolist()
+    if isinstance(col, np.ndarray):
+        col = col.tolist()
+    return [encode_value(key, v) for v in col]
+
+
+def encode_columns(columns: Mapping[str, Any], fmt: str = "sld",
+                   header: Optional[Dict[str, Any]] = None) -> str:
+    """Encode equal-length columns as canonical SLD/MLD records.
+
+    Columns may be ndarrays, masked arrays (masked cells become '!n[') or
+    plain sequences. Numeric and bool columns are formatted with NumPy casts;
+    the output matches canonicalizer.encode_record on the equivalent records.
+    """
+    keys = sorted(columns)
+    lengths = {len(columns[k]) for k in keys}
+    if len(lengths) > 1:
+        raise ValueError("columns must all have the same length")
+    formatted = [_format_column(k, columns[k]) for k in keys]
+    lines = [';'.join(cells) for cells in zip(*formatted)]
+    if header:
+        lines.insert(0, encode_header(header))
+    if fmt == "sld":
+        return REC_SEP_SLD.join(lines) + REC_SEP_SLD
+    return REC_SEP_MLD.join(lines)
+
+
+def encode_recarray(records: Any, fmt: str = "sld", header: Optional[Dict[str, Any]] = None) -> str:
+    """Encode a structured or record array, one record per element."""
+    names = records.dtype.names
+    if not names:
+        raise ValueError("expected a structured array with named fields")
+    return encode_columns({name: records[name] for name in names}, fmt, header)
@@ -0,0 +1,265 @@
+# Copyright 2025 Alfredo Pinto Molina
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Multi-process decoding of large SLD/MLD files.
+
+The file is cut into byte ranges that end on record boundaries; each range
+is decoded by a ProcessPoolExecutor worker and the results are returned in
+file order. Records are identical to parse_sld/parse_mld on the file read
+in text mode (as validator.py does).
+"""
+import os
+import re
+from collections import deque
+from concurrent.futures import ProcessPoolExecutor
+from contextlib import nullcontext
+from typing import IO, Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+from validator import parse_mld, parse_sld_records
+
+# Target size of the byte range decoded by one worker task
+DEFAULT_PARALLEL_CHUNK_SIZE = 16 * 1024 * 1024
+
+# Read size used when looking for a record boundary
+_PROBE_SIZE = 64 * 1024
+
+
+def _mld_boundaries(path: str, chunk_size: int) -> List[int]:
+    # Offsets 0 < b1 < ... < size, each just past a newline
+    size = os.path.getsize(path)
+    bounds = [0]
+    with open(path, "rb") as f:
+        target = chunk_size
+        while target < size:
+            f.seek(target - 1)
+            pos = target - 1
+            while True:
+                block = f.read(_PROBE_SIZE)
+                if not block:
+                    pos = size
+                    break
+                nl = block.find(b"\n")
+                if nl >= 0:
+                    pos += nl + 1
+                    break
+                pos += len(block)
+            if pos >= size:
+                break
+            bounds.append(pos)
+            target = pos + chunk_size
+    bounds.append(size)
+    return bounds
+
+
+def _read_text(path: str, start: int, end: int) -> str:
+    with open(path, "rb") as f:
+        f.seek(start)
+        data = f.read(end - start)
+    # same newline translation as open(path, "r")
+    return data.decode("utf-8").replace("\r\n", "\n").replace("\r", "\n")
+
+
+def _parse_mld_range(path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    return parse_mld(_read_text(path, start, end))
+
+
+# SLD boundaries. A '~' splits records when it is not escaped and not inside
+# an array. Escapes are resolved locally: a byte is escaped iff an odd run of
+# '^' precedes it (newlines are dropped by parse_sld, so they do not break a
+# run). Array depth is not local, so each range is first summarized as a
+# walk over '{' (+1) and '}' (-1, ignored at depth 0): with h the net change
+# and low the lowest point reached, a range entered at depth d is left at
+# max(d + h, h - low), and a '~' seen at local height == running low == L is
+# at depth 0 exactly when L <= -d. Ranges are scanned in parallel, depths are
+# chained in order, then the first top-level '~' of each range is used.
+_SLD_SCAN = re.compile(rb"\^[\r\n]*[^\r\n]?|[{}]")
+_SLD_STOPS = re.compile(rb"\^[\r\n]*[^\r\n]?|[{}~]")
+_ESCAPED_HEAD = re.compile(rb"[\r\n]*[^\r\n]?")
+
+
+def _escaped_at(f: IO, pos: int) -> bool:
+    # True when the byte at pos follows an odd run of '^'
+    run = 0
+    while pos > 0:
+        step = min(_PROBE_SIZE, pos)
+        f.seek(pos - step)
+        block = f.read(step)
+        tail = block[len(block.rstrip(b"^\r\n")):]
+        run += tail.count(b"^")
+        if len(tail) < len(block):
+            break
+        pos -= step
+    return run % 2 == 1
+
+
+def _sld_end(path: str) -> int:
+    # File size without the trailing '~' and newlines parse_sld strips
+    end = os.path.getsize(path)
+    with open(path, "rb") as f:
+        while end > 0:
+            step = min(_PROBE_SIZE, end)
+            f.seek(end - step)
+            block = f.read(step)
+            kept = len(block.rstrip(b"~\r\n"))
+            end -= step - kept
+            if kept:
+                break
+    return end
+
+
+def _scan_sld_range(path: str, start: int, end: int) -> Tuple[int, int, Dict[int, int]]:
+    """Summarize the array walk over bytes [start, end).
+
+    Returns (h, low, seps): net depth change, lowest point, and for each low
+    level L the offset of the first unescaped '~' at that level.
+    """
+    with open(path, "rb") as f:
+        skip = _escaped_at(f, start)
+        f.seek(start)
+        data = f.read(end - start)
+    pos = _ESCAPED_HEAD.match(data).end() if skip else 0
+    h = low = 0
+    seps: Dict[int, int] = {}
+    while True:
+        m = (_SLD_STOPS if h == low and low not in seps else _SLD_SCAN).search(data, pos)
+        if m is None:
+            break
+        ch = data[m.start()]
+        if ch == 0x7B:  # '{'
+            h += 1
+        elif ch == 0x7D:  # '}'
+            h -= 1
+            if h < low:
+                low = h
+        elif ch == 0x7E:  # '~'
+            seps[low] = start + m.start()
+        pos = m.end()
+    return h, low, seps
+
+
+def _sld_spans(path: str, chunk_size: int, pool: Optional[ProcessPoolExecutor],
+               workers: int) -> List[Tuple[int, int]]:
+    # Byte ranges [a, b) holding whole records, separators excluded
+    end = _sld_end(path)
+    offsets = list(range(0, end, chunk_size)) + [end]
+    tasks = [(path, a, b) for a, b in zip(offsets, offsets[1:])]
+    cuts: List[int] = []
+    depth = 0
+    for i, (h, low, seps) in enumerate(_ordered_results(pool, _scan_sld_range, tasks, workers)):
+        if i:
+            found = [p for level, p in seps.items() if level <= -depth]
+            if found:
+                cuts.append(min(found))
+        depth = max(depth + h, h - low)
+    starts = [0] + [c + 1 for c in cuts]
+    return list(zip(starts, cuts + [end]))
+
+
+def _parse_sld_range(path: str, start: int, end: int) -> List[Dict[str, Any]]:
+    return parse_sld_records(_read_text(path, start, end))
+
+
+def _ordered_results(pool: Optional[ProcessPoolExecutor], fn: Callable[..., Any],
+                     tasks: List[Tuple[Any, ...]], workers: int) -> Iterator[Any]:
+    """Run fn over tasks in the pool, yielding results in task order.
+
+    At most two tasks per worker are in flight, so results are not buffered
+    faster than the caller consumes them. Without a pool (or with a single
+    task) fn runs in this process.
+    """
+    if pool is None or len(tasks) == 1:
+        for args in tasks:
+            yield fn(*args)
+        return
+    pending: deque = deque()
+    try:
+        for args in tasks:
+            pending.append(pool.submit(fn, *args))
+            if len(pending) >= 2 * workers:
+                yield pending.popleft().result()
+        while pending:
+            yield pending.popleft().result()
+    finally:
+        for fut in pending:
+            fut.cancel()
+
+
+def _executor(workers: int) -> Any:
+    return ProcessPoolExecutor(max_workers=workers) if workers > 1 else nullcontext()
+
+
+def map_ranges(fn: Callable[..., Any], path: str, fmt: str, workers: Optional[int] = None,
+               chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE, args: Tuple[Any, ...] = ()) -> Iterator[Any]:
+    """Run fn(path, start, end, *args) over byte ranges of whole records.
+
+    The file is cut into ranges of about chunk_size bytes as for
+    parse_mld_parallel / parse_sld_parallel (separators and the trailing
+    '~' are left out of SLD ranges) and fn runs in worker processes, so it
+    and args must be picklable. Results are yielded in file order;
+    workers defaults to os.cpu_count().
+    """
+    workers = workers or os.cpu_count() or 1
+    with _executor(workers) as pool:
+        if fmt == "mld":
+            bounds = _mld_boundaries(path, chunk_size)
+            spans = list(zip(bounds, bounds[1:]))
+        else:
+            spans = _sld_spans(path, chunk_size, pool, workers)
+        tasks = [(path, a, b) + args for a, b in spans]
+        yield from _ordered_results(pool, fn, tasks, workers)
+
+
+def _iter_chunks(path: str, fmt: str, workers: Optional[int], chunk_size: int) -> Iterator[List[Dict[str, Any]]]:
+    return map_ranges(_parse_mld_range if fmt == "mld" else _parse_sld_range, path, fmt, workers, chunk_size)
+
+
+def iter_parse_mld_parallel(path: str, workers: Optional[int] = None,
+                            chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Decode an MLD file in worker processes, yielding records in file order.
+
+    The file is split into ranges of about chunk_size bytes aligned to
+    newlines; workers defaults to os.cpu_count().
+    """
+    for records in _iter_chunks(path, "mld", workers, chunk_size):
+        yield from records
+
+
+def parse_mld_parallel(path: str, workers: Optional[int] = None,
+                       chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE) -> List[Dict[str, Any]]:
+    """Decode an MLD file in worker processes; same result as parse_mld."""
+    out: List[Dict[str, Any]] = []
+    for records in _iter_chunks(path, "mld", workers, chunk_size):
+        out.extend(records)
+    return out
+
+
+def iter_parse_sld_parallel(path: str, workers: Optional[int] = None,
+                            chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE) -> Iterator[Dict[str, Any]]:
+    """Decode an SLD file in worker processes, yielding records in file order.
+
+    Ranges of about chunk_size bytes end on a record separator that is
+    neither escaped nor inside an array; see _sld_spans.
+    """
+    for records in _iter_chunks(path, "sld", workers, chunk_size):
+        yield from records
+
+
+def parse_sld_parallel(path: str, workers: Optional[int] = None,
+                       chunk_size: int = DEFAULT_PARALLEL_CHUNK_SIZE) -> List[Dict[str, Any]]:
+    """Decode an SLD file in worker processes; same result as parse_sld."""
+    out: List[Dict[str, Any]] = []
+    for records in _iter_chunks(path, "sld", workers, chunk_size):
+        out.extend(records)
+    return out
@@ -0,0 +1,165 @@
+#!/usr/bin/env python3
+# Copyright 2025 Alfredo Pinto Molina
+#
+# Licensed under the Apache License, Version 2.0 (the "License");
+# you may not use this file except in compliance with the License.
+# You may obtain a copy of the License at
+#
+#     http://www.apache.org/licenses/LICENSE-2.0
+#
+# Unless required by applicable law or agreed to in writing, software
+# distributed under the License is distributed on an "AS IS" BASIS,
+# WITHOUT WARRANTIES OR CONDITIONS OF ANY KIND, either express or implied.
+# See the License for the specific language governing permissions and
+# limitations under the License.
+
+"""
+Streaming queries over SLD/MLD files:
+- select: keep only some fields (validator fields= projection)
+- where: equality, prefix and numeric range predicates (validator where=)
+- offset / limit / count over the matching records
+- Output as MLD, SLD or JSON Lines (header on the first line, as convert.py)
+
+Records are read one at a time (mmap for files, chunked reads for stdin), so
+memory does not grow with the input, and reading stops as soon as limit
+records have been produced.
+"""
+import json
+import re
+import sys
+from itertools import chain, islice
+from typing import IO, Any, Dict, Iterable, Iterator, List, Optional, Tuple, Union
+
+from validator import InRange, StartsWith, iter_record_texts, parse_record, record_parser, write_json
+from canonicalizer import RecordWriter
+
+OUTPUT_FORMATS = ("jsonl", "mld", "sld")
+
+
+def _split_header(texts: Iterator[str]) -> Tuple[Optional[Dict[str, Any]], Iterator[str]]:
+    # Decode the first raw record when it is a header (see detect_header)
+    first = next(texts, None)
+    if first is None:
+        return None, texts
+    rec = parse_record(first)
+    if all(k.startswith("!") for k in rec):
+        return rec, texts
+    return None, chain([first], texts)
+
+
+def query(source: Union[str, IO], fmt: Optional[str] = None, select: Optional[Iterable[str]] = None,
+          where: Optional[Iterable[Any]] = None, offset: int = 0,
+          limit: Optional[int] = None) -> Tuple[Optional[Dict[str, Any]], Iterator[Dict[str, Any]]]:
+    """Run a query over a file path or an open file object.
+
+    Returns (header, records). The header record, if any, is read up front
+    and is never selected, filtered or counted. records yields the matching
+    records lazily: the first offset matches are skipped and reading stops
+    after limit records. select and where work as fields= and where= of
+    validator.parse_sld. fmt defaults to the validator CLI's detection for
+    paths and is required for file objects.
+    """
+    if fmt is None and not isinstance(source, str):
+        raise ValueError("fmt is required when reading a file object")
+    header, texts = _split_header(iter_record_texts(source, fmt))
+    parse = record_parser(select, where)
+    records = (rec for rec in map(parse, texts) if rec is not None)
+    stop = None if limit is None else offset + limit
+    return header, islice(records, offset, stop)
+
+
+class _EqualsText:
+    """Keep records whose value for key equals a --where operand.
+
+    The operand matches as a JSON literal (typed '!i' / '!f' / '!b' values)
+    or as its plain text (untyped values, which are strings).
+    """
+
+    __slots__ = ("key", "values")
+
+    def __init__(self, key: str, text: str):
+        self.key = key
+        literal = _literal(text)
+        self.values = (literal, text) if literal != text else (text,)
+
+    def test(self, values: Dict[str, Any]) -> bool:
+        if self.key not in values:
+            return False
+        value = values[self.key]
+        return any(value == v and isinstance(value, bool) == isinstance(v, bool) for v in self.values)
+
+
+def _literal(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return text
+
+
+_WHERE = re.compile(r"(.+?)(\^=|>=|<|=)(.*)", re.S)
+
+
+def parse_where(expr: str) -> Any:
+    """Predicate of one --where expression.
+
+    KEY=VALUE (equal), KEY^=PREFIX (string prefix), KEY>=N and KEY<N
+    (numbers, bounds of validator.InRange). Repeat --where to combine.
+    """
+    m = _WHERE.fullmatch(expr)
+    if m is None:
+        raise ValueError(f"invalid where expression: {expr!r}")
+    key, op, operand = m.groups()
+    if op == "=":
+        return _EqualsText(key, operand)
+    if op == "^=":
+        return StartsWith(key, operand)
+    bound = _literal(operand)
+    if not isinstance(bound, (int, float)) or isinstance(bound, bool):
+        raise ValueError(f"{op} needs a number: {expr!r}")
+    return InRange(key, lo=bound) if op == ">=" else InRange(key, hi=bound)
+
+
+def main(argv: List[str]) -> int:
+    import argparse
+
+    p = argparse.ArgumentParser(description="Query an SLD/MLD file in constant memory")
+    p.add_argument("file", nargs="?", help="Input file (.sld or .mld). If omitted, reads stdin")
+    p.add_argument("--format", choices=["sld", "mld"], help="Force input format detection (required for stdin)")
+    p.add_argument("--select", metavar="FIELD[,FIELD...]", help="Keep only these fields")
+    p.add_argument("--where", metavar="EXPR", action="append", default=[],
+                   help="KEY=VALUE, KEY^=PREFIX, KEY>=N or KEY<N; repeat to combine")
+    p.add_argument("--offset", type=int, default=0, help="Skip the first N matching records")
+    p.add_argument("--limit", type=int, help="Stop after N records")
+    p.add_argument("--count", action="store_true", help="Print the number of matching records only")
+    p.add_argument("--output", choices=OUTPUT_FORMATS, default="jsonl", help="Output format (default: jsonl, header first if present)")
+    args = p.parse_args(argv)
+    if args.file is None and args.format is None:
+        p.error("--format is required when reading stdin")
+    if args.offset < 0 or (args.limit is not None and args.limit < 0):
+        p.error("--offset and --limit must not be negative")
+    try:
+        where = [parse_where(expr) for expr in args.where] or None
+    except ValueError as e:
+        p.error(str(e))
+    select = [f for f in args.select.split(",") if f] if args.select is not None else None
+    if args.count and select is None:
+        select = []  # nothing to decode beyond the where fields
+
+    # Ensure UTF-8 output on Windows
+    import io
+    out = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
+    header, records = query(args.file or sys.stdin, args.format, select, where, args.offset, args.limit)
+    if args.count:
+        out.write(f"{sum(1 for _ in records)}\n")
+    elif args.output == "jsonl":
+        write_json(out, header, records, lines=True)
+    else:
+        with RecordWriter(out, args.output, header) as writer:
+            writer.write_all(records)
+        out.write("\n")
+    out.flush()
+    return 0
+
+
+if __name__ == "__main__":
+    raise SystemExit(main(sys.argv[1:]))
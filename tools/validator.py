@@ -12,10 +12,19 @@
 # See the License for the specific language governing permissions and
 # limitations under the License.
 
+import codecs
 import json
+import mmap
+import os
+import re
 import sys
 import unicodedata
-from typing import Any, Dict, List, Optional, Tuple
+from array import array
+from collections.abc import Mapping
+from contextlib import contextmanager
+from functools import lru_cache
+from itertools import chain
+from typing import IO, Any, AsyncIterator, Callable, Dict, FrozenSet, Iterable, Iterator, List, Optional, Tuple, Union
 
 
 # SLD/MLD core tokens (v2.0)
@@ -29,12 +38,43 @@ ESC = "^"
 
 TYPE_CODES = {"i", "f", "b", "s", "n", "d", "t", "ts"}
 
+# Streaming readers pull this many characters (or bytes) per read() call
+DEFAULT_CHUNK_SIZE = 64 * 1024
+
 
 class ParseError(Exception):
-    def __init__(self, message: str, pos: Optional[int] = None, code: str = "E01"):
+    # pos is a byte offset (a character offset for str input) and record
+    # the index of the record in the parsed list, when known
+    def __init__(self, message: str, pos: Optional[int] = None, code: str = "E01",
+                 record: Optional[int] = None):
         super().__init__(message)
         self.pos = pos
         self.code = code
+        self.record = record
+
+
+# Escape engine of the tools (canonicalizer.py uses it too). The tables are
+# those of implementations/python/sld.py, which documents them, extended with
+# '}' and '^_'. sld.py is a standalone single-module package and the tools
+# run from a checkout without it installed, so neither side imports the
+# other: the escape engine and the buffered record writers
+# (canonicalizer.RecordWriter, sld.SLDWriter/MLDWriter) exist once per side.
+ESCAPED_CHARS = (ESC, FIELD_SEP, REC_SEP_SLD, PROP_MARK, ARR_OPEN, ARR_CLOSE)
+_ESCAPE_TABLE = tuple((ch, ESC + ch) for ch in ESCAPED_CHARS)
+_NEEDS_ESCAPE = re.compile("[" + re.escape("".join(ESCAPED_CHARS)) + "]")
+_UNESCAPE_CODES = {"1": "True", "0": "False", "_": ""}
+
+
+def escape_text(value: str) -> str:
+    """Escape the SLD/MLD special characters of a scalar.
+
+    Values with nothing to escape are returned untouched, without a copy.
+    """
+    if _NEEDS_ESCAPE.search(value) is None:
+        return value
+    for ch, escaped in _ESCAPE_TABLE:
+        value = value.replace(ch, escaped)
+    return value
 
 
 def _is_escaped(s: str, i: int) -> bool:
@@ -51,38 +91,40 @@ def _unescape(text: str) -> Tuple[Any, bool, bool]:
     """
     if text is None:
         return "", False, False
+    if ESC not in text:
+        return text, False, False
+    if ("^^" not in text and "^1" not in text and "^0" not in text
+            and "^_" not in text and not text.endswith(ESC)):
+        # every '^' escapes an ordinary character: drop them in one pass
+        return text.replace(ESC, ""), False, False
 
     out: List[str] = []
     i = 0
+    n = len(text)
     is_bool = False
     is_null = False
-    while i < len(text):
-        ch = text[i]
-        if ch == ESC:
-            if i + 1 >= len(text):
-                # dangling escape, keep literally
-                out.append(ESC)
-                i += 1
-                continue
-            nxt = text[i + 1]
-            if nxt == "1":
-                out.append("True")
-                is_bool = True
-                i += 2
-            elif nxt == "0":
-                out.append("False")
-                is_bool = True
-                i += 2
-            elif nxt == "_":
-                # legacy null
-                is_null = True
-                i += 2
-            else:
-                out.append(nxt)
-                i += 2
+    while True:
+        j = text.find(ESC, i)
+        if j < 0:
+            out.append(text[i:])
+            break
+        out.append(text[i:j])
+        if j + 1 >= n:
+            # dangling escape, keep literally
+            out.append(ESC)
+            break
+        nxt = text[j + 1]
+        code = _UNESCAPE_CODES.get(nxt)
+        if code is None:
+            out.append(nxt)
+        elif code:
+            # ^1 / ^0
+            out.append(code)
+            is_bool = True
         else:
-            out.append(ch)
-            i += 1
+            # ^_ legacy null
+            is_null = True
+        i = j + 2
     s = "".join(out)
     if is_bool:
         return (True if s == "True" else False if s == "False" else s), True, False
@@ -117,76 +159,11 @@ def _read_until(s: str, start: int, stops: List[str]) -> Tuple[str, int]:
     return "".join(buf), i
 
 
-def _split_records_sld(s: str) -> List[str]:
-    # split by top-level ~ (outside arrays)
-    parts: List[str] = []
-    buf: List[str] = []
-    depth = 0
-    i = 0
-    while i < len(s):
-        ch = s[i]
-        if ch == ESC and i + 1 < len(s):
-            buf.append(s[i:i+2])
-            i += 2
-            continue
-        if ch == ARR_OPEN:
-            depth += 1
-            buf.append(ch)
-            i += 1
-            continue
-        if ch == ARR_CLOSE and depth > 0:
-            depth -= 1
-            buf.append(ch)
-            i += 1
-            continue
-        if ch == REC_SEP_SLD and depth == 0:
-            parts.append("".join(buf))
-            buf = []
-            i += 1
-            continue
-        buf.append(ch)
-        i += 1
-    if buf:
-        parts.append("".join(buf))
-    return [p for p in parts if p != ""]
-
-
-def _split_fields(record: str) -> List[str]:
-    # split by ; outside arrays
-    parts: List[str] = []
-    buf: List[str] = []
-    depth = 0
-    i = 0
-    while i < len(record):
-        ch = record[i]
-        if ch == ESC and i + 1 < len(record):
-            buf.append(record[i:i+2])
-            i += 2
-            continue
-        if ch == ARR_OPEN:
-            depth += 1
-            buf.append(ch)
-            i += 1
-            continue
-        if ch == ARR_CLOSE and depth > 0:
-            depth -= 1
-            buf.append(ch)
-            i += 1
-            continue
-        if ch == FIELD_SEP and depth == 0:
-            parts.append("".join(buf))
-            buf = []
-            i += 1
-            continue
-        buf.append(ch)
-        i += 1
-    if buf:
-        parts.append("".join(buf))
-    return [p for p in parts if p != ""]
-
+def parse_key_and_type(head: str) -> Tuple[str, Optional[str]]:
+    """Split a key head ('key' or 'key!t') into (key, type code or None).
 
-def _parse_key_and_type(head: str) -> Tuple[str, Optional[str]]:
-    # head is everything up to the value opener ('[' or '{')
+    head is everything up to the value opener ('[' or '{').
+    """
     # Inline type attaches with a '!' not at position 0
     if "!" not in head:
         return head, None
@@ -238,50 +215,142 @@ def _convert_typed(val_text: str, t: str) -> Any:
     return v
 
 
-def _parse_array(s: str, i: int, elem_type: Optional[str]) -> Tuple[List[Any], int]:
-    # s[i] is at ARR_OPEN
-    assert s[i] == ARR_OPEN
-    i += 1
-    items: List[Any] = []
-    buf: List[str] = []
-    depth = 1
-    while i < len(s):
-        ch = s[i]
-        if ch == ESC and i + 1 < len(s):
-            buf.append(s[i:i+2])
-            i += 2
-            continue
-        if ch == ARR_OPEN:
-            # nested array start; include in buf and track depth
-            buf.append(ch)
+# Tokenizer stop sets: the only characters that can change scanner state.
+# Everything between two stops is skipped by the regex engine, not by Python.
+_KEY_STOPS_SLD = re.compile(r"[\^;~\[{]")
+_KEY_STOPS_MLD = re.compile(r"[\^;\[{]")
+_VALUE_STOPS_SLD = re.compile(r"[\^;~{}]")
+_VALUE_STOPS_MLD = re.compile(r"[\^;{}]")
+_ARRAY_STOPS = re.compile(r"[\^~{}]")
+_NON_SPACE = re.compile(r"\S")
+# Text without escapes or arrays splits on plain ';'/'~' at C speed
+_NEEDS_SCAN = re.compile(r"[\^{]")
+
+# Field kinds produced by _tokenize_record (see tokenize_records)
+FIELD_BARE = 0    # key without a value opener
+FIELD_SCALAR = 1  # key[value
+FIELD_ARRAY = 2   # key{elem~elem}
+
+
+def _scan_value_end(s: str, i: int, n: int, stops: Any) -> Tuple[int, str]:
+    # Find the end of a field whose value starts at i: the first ';' (or '~'
+    # for SLD) outside braces. Returns (end, separator or "" at end of input).
+    depth = 0
+    while True:
+        m = stops.search(s, i, n)
+        if m is None:
+            return n, ""
+        j = m.start()
+        ch = s[j]
+        if ch == ESC:
+            i = j + 2
+        elif ch == ARR_OPEN:
             depth += 1
-            i += 1
-            continue
-        if ch == ARR_CLOSE:
-            depth -= 1
-            if depth == 0:
-                # finalize last element if any
-                elem_text = "".join(buf)
-                if elem_text != "":
-                    # an element can be typed inline like !i[123] or untyped scalar
-                    items.append(_parse_element_value(elem_text, elem_type))
-                buf = []
-                i += 1
+            i = j + 1
+        elif ch == ARR_CLOSE:
+            if depth > 0:
+                depth -= 1
+            i = j + 1
+        elif depth > 0:
+            i = j + 1
+        else:
+            return j, ch
+
+
+def _tokenize_record(s: str, i: int, n: int, sld: bool) -> Tuple[List[Tuple[int, int, int, int, Any]], int]:
+    """Tokenize the record starting at s[i] in one left-to-right pass.
+
+    Returns (fields, end) where end is the index of the record separator
+    (or n). Each field is (start, opener, kind, end, elems): the key head is
+    s[start:opener], a scalar value is s[opener + 1:end] and an array lists
+    its element spans in elems. Nothing is copied until a builder slices.
+    """
+    key_search = (_KEY_STOPS_SLD if sld else _KEY_STOPS_MLD).search
+    value_stops = _VALUE_STOPS_SLD if sld else _VALUE_STOPS_MLD
+    value_search = value_stops.search
+    fields: List[Tuple[int, int, int, int, Any]] = []
+    while i < n:
+        start = i
+        # key: up to the first unescaped '[' or '{'
+        while True:
+            m = key_search(s, i, n)
+            if m is None:
+                p, ch = n, ""
+                break
+            p = m.start()
+            ch = s[p]
+            if ch != ESC:
                 break
+            i = p + 2
+        if ch == PROP_MARK:
+            m = value_search(s, p + 1, n)
+            if m is None:
+                end, ch = n, ""
             else:
-                buf.append(ch)
-                i += 1
-                continue
-        if ch == REC_SEP_SLD and depth == 1:
-            # element separator at top array level
-            elem_text = "".join(buf)
-            items.append(_parse_element_value(elem_text, elem_type))
-            buf = []
-            i += 1
-            continue
-        buf.append(ch)
-        i += 1
-    return items, i
+                end = m.start()
+                ch = s[end]
+                if ch == ESC or ch == ARR_OPEN or ch == ARR_CLOSE:
+                    # escapes or braces in the value: track pairs and depth
+                    end, ch = _scan_value_end(s, p + 1, n, value_stops)
+            fields.append((start, p, FIELD_SCALAR, end, None))
+        elif ch == ARR_OPEN:
+            elems: List[Tuple[int, int]] = []
+            depth = 1
+            k = elem_start = p + 1
+            closed = False
+            while True:
+                m = _ARRAY_STOPS.search(s, k, n)
+                if m is None:
+                    # unterminated array: the pending element is dropped
+                    break
+                j = m.start()
+                c = s[j]
+                k = j + 1
+                if c == ESC:
+                    k = j + 2
+                elif c == ARR_OPEN:
+                    depth += 1
+                elif c == ARR_CLOSE:
+                    depth -= 1
+                    if depth == 0:
+                        if j > elem_start:
+                            elems.append((elem_start, j))
+                        closed = True
+                        break
+                elif depth == 1:
+                    elems.append((elem_start, j))
+                    elem_start = k
+            if closed:
+                # anything after '}' up to the field end is ignored
+                end, ch = _scan_value_end(s, k, n, value_stops)
+            else:
+                end, ch = n, ""
+            fields.append((start, p, FIELD_ARRAY, end, elems))
+        else:
+            # key with empty value, ended by ';', '~' or end of record
+            end = p
+            if end > start:
+                fields.append((start, end, FIELD_BARE, end, None))
+        if ch != FIELD_SEP:
+            return fields, end
+        i = end + 1
+    return fields, n
+
+
+def scalar_value(value_text: str, tcode: Optional[str]) -> Any:
+    """Decoded value of a scalar's raw text, typed by tcode when given."""
+    # Trim accidental trailing ']' (not a grammar token)
+    if value_text.endswith(']') and not value_text.endswith('^]'):
+        value_text = value_text[:-1]
+    if tcode:
+        # typed scalar
+        if tcode == "n":
+            # Type code 'n' no longer used for null in v2.0 (use ^_ instead)
+            # Preserve for backward compatibility
+            return None
+        return _convert_typed(value_text, tcode)
+    v, _, _ = _unescape(value_text)
+    return v
 
 
 def _parse_element_value(text: str, elem_type: Optional[str]) -> Any:
@@ -298,81 +367,1455 @@ def _parse_element_value(text: str, elem_type: Optional[str]) -> Any:
     if elem_type:
         return _convert_typed(text, elem_type)
     # untyped scalar
-    v, is_bool, is_null = _unescape(text)
-    if is_null:
-        return None
-    if is_bool:
-        return v
+    v, _, _ = _unescape(text)
     return v
 
 
-def _parse_record(record: str) -> Dict[str, Any]:
-    out: Dict[str, Any] = {}
-    for field in _split_fields(record):
-        # locate first unescaped value opener '[' or '{'
+def _plain_field(field: str) -> Tuple[str, Optional[str], int, Any]:
+    # (key, type code, kind, raw) of one field of a record with no '^' and
+    # no '{': the field is split at its first '['
+    key, opener, raw = field.partition(PROP_MARK)
+    tcode = None
+    if "!" in key:
+        key, tcode = parse_key_and_type(key)
+    return key, tcode, FIELD_SCALAR if opener else FIELD_BARE, raw
+
+
+def _iter_fields(s: str, fields: Optional[List[Tuple[int, int, int, int, Any]]] = None,
+                 keys: Optional[FrozenSet[str]] = None) -> Iterator[Tuple[str, Optional[str], int, Any]]:
+    """Yield (key, type code, kind, raw) for every field of a record.
+
+    With fields None, s is a plain record (no '^', no '{') split on ';'.
+    Otherwise fields are _tokenize_record spans into s. raw is the value
+    text of a scalar, the element spans of an array, or None for a bare
+    key. keys, when given, skips other fields before their value is sliced.
+    """
+    if fields is None:
+        for field in s.split(FIELD_SEP):
+            if field:
+                item = _plain_field(field)
+                if keys is None or item[0] in keys:
+                    yield item
+        return
+    for start, opener, kind, end, elems in fields:
+        key = s[start:opener]
+        tcode = None
+        if "!" in key:
+            key, tcode = parse_key_and_type(key)
+        if keys is not None and key not in keys:
+            continue
+        if kind == FIELD_SCALAR:
+            yield key, tcode, kind, s[opener + 1:end]
+        elif kind == FIELD_ARRAY:
+            yield key, tcode, kind, elems
+        else:
+            yield key, tcode, kind, None
+
+
+def _field_value(s: str, tcode: Optional[str], kind: int, raw: Any) -> Any:
+    # Decoded value of a field from _iter_fields
+    if kind == FIELD_SCALAR:
+        if tcode is None and ESC not in raw and not raw.endswith("]"):
+            # plain string, nothing to unescape or convert
+            return raw
+        return scalar_value(raw, tcode)
+    if kind == FIELD_ARRAY:
+        # array container; element type from tcode if present
+        return [_parse_element_value(s[a:b], tcode) for a, b in raw]
+    return None
+
+
+def _build_record(s: str, fields: List[Tuple[int, int, int, int, Any]],
+                  keys: Optional[FrozenSet[str]] = None) -> Dict[str, Any]:
+    # keys, when given, limits the record to those keys (projection)
+    return {key: _field_value(s, tcode, kind, raw)
+            for key, tcode, kind, raw in _iter_fields(s, fields, keys)}
+
+
+def field_item(s: str, field: Tuple[int, int, int, int, Any]) -> Tuple[str, Optional[str], Any]:
+    """(key, type code, decoded value) of one field from tokenize_records."""
+    start, opener, kind, end, elems = field
+    key, tcode = parse_key_and_type(s[start:opener])
+    if kind == FIELD_SCALAR:
+        return key, tcode, scalar_value(s[opener + 1:end], tcode)
+    if kind == FIELD_ARRAY:
+        return key, tcode, [_parse_element_value(s[a:b], tcode) for a, b in elems]
+    return key, tcode, None
+
+
+def _parse_plain_record(record: str) -> Dict[str, Any]:
+    # Fast path for a record with no '^' and no '{': fields are plain
+    # ';'-separated, each split at its first '['.
+    if "!" not in record and "]" not in record:
+        # no type codes and nothing to trim: values are final as split
+        return {key: raw if opener else None
+                for key, opener, raw in (f.partition(PROP_MARK) for f in record.split(FIELD_SEP) if f)}
+    return {key: _field_value(record, tcode, kind, raw)
+            for key, tcode, kind, raw in _iter_fields(record)}
+
+
+def parse_record(record: str) -> Dict[str, Any]:
+    """Decode one raw record, as split by iter_record_texts or byte_spans."""
+    if ESC not in record and ARR_OPEN not in record:
+        return _parse_plain_record(record)
+    fields, _ = _tokenize_record(record, 0, len(record), False)
+    return _build_record(record, fields)
+
+
+class LazyRecord(Mapping):
+    """A parsed record whose values are decoded on first access.
+
+    Keys are found up front. Values that need unescaping or type conversion
+    are kept as a (type code, kind, raw) tuple (decoded values are never
+    tuples) and decoded the first time they are read, then cached.
+    Iteration order, len(), equality and dict(record) match the dict
+    parse_record returns.
+    """
+
+    __slots__ = ("_s", "_values")
+
+    def __init__(self, record: str):
+        # plain strings are final as sliced; everything else waits as raw
+        values: Dict[str, Any] = {}
+        fields = None
+        if ESC in record or ARR_OPEN in record:
+            fields = _tokenize_record(record, 0, len(record), False)[0]
+        for key, tcode, kind, raw in _iter_fields(record, fields):
+            if kind == FIELD_BARE:
+                values[key] = None
+            elif kind == FIELD_SCALAR and tcode is None and ESC not in raw and not raw.endswith("]"):
+                values[key] = raw
+            else:
+                values[key] = (tcode, kind, raw)
+        self._s = record
+        self._values = values
+
+    def __getitem__(self, key: str) -> Any:
+        value = self._values[key]
+        if type(value) is tuple:
+            value = self._values[key] = _field_value(self._s, *value)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._values)
+
+    def __len__(self) -> int:
+        return len(self._values)
+
+    def __contains__(self, key: object) -> bool:
+        return key in self._values
+
+    def __repr__(self) -> str:
+        return f"LazyRecord({dict(self)!r})"
+
+
+class _Projection:
+    """Record builders that decode only the given keys (fields= on the parsers).
+
+    Other fields are skipped by their bounds: the tokenizer only records
+    offsets, and in plain records the fields are located with str.find on
+    ';' + key, so no substring is built for the rest.
+    """
+
+    __slots__ = ("keys", "_markers")
+
+    def __init__(self, keys: FrozenSet[str]):
+        self.keys = keys
+        # a record key is a prefix of its head (the head minus any '!type')
+        self._markers = [(k, FIELD_SEP + k) for k in keys]
+
+    def plain(self, record: str) -> Dict[str, Any]:
+        # Same result as _parse_plain_record restricted to keys
+        starts = set()
+        for key, marker in self._markers:
+            if record.startswith(key):
+                starts.add(0)
+            i = record.find(marker)
+            while i >= 0:
+                starts.add(i + 1)
+                i = record.find(marker, i + 1)
+        out: Dict[str, Any] = {}
+        if not starts:
+            return out
+        keys = self.keys
+        for start in sorted(starts):
+            stop = record.find(FIELD_SEP, start)
+            field = record[start:stop] if stop >= 0 else record[start:]
+            if not field:
+                continue
+            key, tcode, kind, raw = _plain_field(field)
+            if key in keys:
+                out[key] = _field_value(record, tcode, kind, raw)
+        return out
+
+    def build(self, s: str, fields: List[Tuple[int, int, int, int, Any]]) -> Dict[str, Any]:
+        return _build_record(s, fields, self.keys)
+
+    def __call__(self, record: str) -> Dict[str, Any]:
+        if ESC not in record and ARR_OPEN not in record:
+            return self.plain(record)
+        return _build_record(record, _tokenize_record(record, 0, len(record), False)[0], self.keys)
+
+
+@lru_cache(maxsize=64)
+def _projection(keys: FrozenSet[str]) -> _Projection:
+    return _Projection(keys)
+
+
+# where= predicates. Each tests the decoded value of one key; a record is
+# kept when all of them hold.
+class Equals:
+    """Keep records whose value for key equals value.
+
+    Booleans only equal booleans: True does not match 1, nor 1.0 True.
+    """
+
+    __slots__ = ("key", "value", "_is_bool")
+
+    def __init__(self, key: str, value: Any):
+        self.key = key
+        self.value = value
+        self._is_bool = isinstance(value, bool)
+
+    def test(self, values: Dict[str, Any]) -> bool:
+        if self.key not in values:
+            return False
+        value = values[self.key]
+        return value == self.value and isinstance(value, bool) == self._is_bool
+
+
+class StartsWith:
+    """Keep records whose value for key is a string starting with prefix."""
+
+    __slots__ = ("key", "prefix")
+
+    def __init__(self, key: str, prefix: str):
+        self.key = key
+        self.prefix = prefix
+
+    def test(self, values: Dict[str, Any]) -> bool:
+        value = values.get(self.key)
+        return isinstance(value, str) and value.startswith(self.prefix)
+
+
+class InRange:
+    """Keep records whose value for key is a number with lo <= value < hi.
+
+    Numbers come from '!i' / '!f' fields; untyped digits are strings and do
+    not match. Either bound may be None.
+    """
+
+    __slots__ = ("key", "lo", "hi")
+
+    def __init__(self, key: str, lo: Any = None, hi: Any = None):
+        self.key = key
+        self.lo = lo
+        self.hi = hi
+
+    def test(self, values: Dict[str, Any]) -> bool:
+        value = values.get(self.key)
+        if not isinstance(value, (int, float)) or isinstance(value, bool):
+            return False
+        return (self.lo is None or value >= self.lo) and (self.hi is None or value < self.hi)
+
+
+class _Filter:
+    """Record parser that drops records failing the where= predicates.
+
+    Only the predicate fields are located and decoded first (see
+    _Projection; a plain untyped value is tested on its raw slice). The
+    record is decoded by parse only when every predicate holds; rejected
+    records come back as None.
+    """
+
+    __slots__ = ("_where", "_keys", "_parse")
+
+    def __init__(self, where: Iterable[Any], parse: Callable[[str], Any]):
+        self._where = tuple(where)
+        self._keys = frozenset(p.key for p in self._where)
+        self._parse = parse
+
+    def __call__(self, record: str) -> Any:
+        if ESC not in record and ARR_OPEN not in record:
+            values = _projection(self._keys).plain(record)
+            spans = None
+        else:
+            spans = _tokenize_record(record, 0, len(record), False)[0]
+            values = _build_record(record, spans, self._keys)
+        for pred in self._where:
+            if not pred.test(values):
+                return None
+        if spans is not None and self._parse is parse_record:
+            return _build_record(record, spans)
+        return self._parse(record)
+
+
+def record_parser(fields: Optional[Iterable[str]] = None, where: Optional[Iterable[Any]] = None,
+                  lazy: bool = False) -> Callable[[str], Any]:
+    """Parser of one raw record, with fields, where and lazy as for parse_sld.
+
+    With where, it returns None for the records the predicates drop.
+    """
+    if fields is not None:
+        parse: Callable[[str], Any] = _projection(frozenset(fields))
+    else:
+        parse = LazyRecord if lazy else parse_record
+    if where is not None:
+        return _Filter(where, parse)
+    return parse
+
+
+def _record_texts(text: str, fmt: str) -> List[str]:
+    # Raw records of a whole document, split as parse_sld/parse_mld split them
+    splitter = _RecordSplitter(fmt)
+    return splitter.feed(text) + splitter.close()
+
+
+def parse_sld(text: str, lazy: bool = False, fields: Optional[Iterable[str]] = None,
+              where: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+    # lazy=True returns LazyRecord mappings that decode values on access;
+    # fields=keys keeps only those keys and skips every other field (and
+    # takes precedence over lazy); where=[Equals(...), ...] keeps only the
+    # records matching every predicate, testing them before full decode
+    if where is not None:
+        parse = record_parser(fields, where, lazy)
+        return [rec for rec in map(parse, _record_texts(text, "sld")) if rec is not None]
+    if lazy and fields is None:
+        return [LazyRecord(rec) for rec in _record_texts(text, "sld")]
+    # Normalize accidental newlines (e.g., CRLF in files saved on Windows)
+    text = text.replace("\r", "")
+    text = text.replace("\n", "")
+    text = text.rstrip(REC_SEP_SLD)
+    if fields is not None:
+        proj = _projection(frozenset(fields))
+        return _parse_sld_records(text, proj.plain, proj.build)
+    return _parse_sld_records(text)
+
+
+def _parse_sld_records(text: str, plain: Callable[[str], Dict[str, Any]] = _parse_plain_record,
+                       build: Callable[..., Dict[str, Any]] = _build_record) -> List[Dict[str, Any]]:
+    # Records of already normalized SLD text (no newlines, trailing '~' removed)
+    out: List[Dict[str, Any]] = []
+    n = len(text)
+    i = 0
+    while i < n:
+        # Whole records before the next '^' or '{' are split with str.split;
+        # only the record holding it goes through the tokenizer.
+        m = _NEEDS_SCAN.search(text, i)
+        cut = text.rfind(REC_SEP_SLD, i, m.start()) if m else n
+        if cut > i:
+            for rec in text[i:cut].split(REC_SEP_SLD):
+                if rec:
+                    out.append(plain(rec))
+            i = cut + 1
+            continue
+        if text[i] == REC_SEP_SLD:
+            # empty record
+            i += 1
+            continue
+        fields, end = _tokenize_record(text, i, n, True)
+        out.append(build(text, fields))
+        i = end + 1
+    return out
+
+
+def parse_sld_records(text: str) -> List[Dict[str, Any]]:
+    """Records of SLD text cut out of a document at a record separator.
+
+    As parse_sld, but trailing '~' are not stripped, so a cut that ends in
+    an escaped '~' keeps it (see parallel.py).
+    """
+    return _parse_sld_records(text.replace("\r", "").replace("\n", ""))
+
+
+def parse_mld(text: str, lazy: bool = False, fields: Optional[Iterable[str]] = None,
+              where: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+    # lazy, fields and where as for parse_sld
+    if where is not None:
+        parse = record_parser(fields, where, lazy)
+        return [rec for rec in map(parse, _record_texts(text, "mld")) if rec is not None]
+    if lazy and fields is None:
+        return [LazyRecord(rec) for rec in _record_texts(text, "mld")]
+    if fields is not None:
+        proj = _projection(frozenset(fields))
+        plain, build = proj.plain, proj.build
+    else:
+        plain, build = _parse_plain_record, _build_record
+    if ESC not in text and ARR_OPEN not in text:
+        return [plain(ln) for ln in text.split(REC_SEP_MLD) if ln.strip()]
+    return _parse_mld_records(text, plain, build)
+
+
+def _parse_mld_records(text: str, plain: Callable[[str], Dict[str, Any]] = _parse_plain_record,
+                       build: Callable[..., Dict[str, Any]] = _build_record) -> List[Dict[str, Any]]:
+    # Records of MLD text, one line at a time; lines without '^' or '{' go
+    # to plain, the others are tokenized in place and go to build
+    out: List[Dict[str, Any]] = []
+    n = len(text)
+    i = 0
+    while i <= n:
+        end = text.find(REC_SEP_MLD, i)
+        if end < 0:
+            end = n
+        # skip blank lines
+        if not _NON_SPACE.search(text, i, end):
+            pass
+        elif _NEEDS_SCAN.search(text, i, end) is None:
+            out.append(plain(text[i:end]))
+        else:
+            spans, _ = _tokenize_record(text, i, end, False)
+            out.append(build(text, spans))
+        i = end + 1
+    return out
+
+
+def tokenize_records(text: str, fmt: str) -> Tuple[str, Iterator[List[Tuple[int, int, int, int, Any]]]]:
+    """Tokenize a whole document record by record.
+
+    Returns (s, records): field spans in each yielded list index into s,
+    which is text after the same normalization parse_sld/parse_mld apply.
+    Each field is (start, opener, kind, end, elems) with kind one of
+    FIELD_BARE, FIELD_SCALAR, FIELD_ARRAY: the key head is s[start:opener]
+    (see parse_key_and_type), a scalar's raw text is s[opener + 1:end] (see
+    scalar_value) and elems holds an array's element spans. field_item
+    decodes a whole field.
+    """
+    if fmt == "sld":
+        s = text.replace("\r", "").replace("\n", "").rstrip(REC_SEP_SLD)
+    else:
+        s = text
+
+    def records() -> Iterator[List[Tuple[int, int, int, int, Any]]]:
+        n = len(s)
         i = 0
-        opener = None
-        while i < len(field):
-            ch = field[i]
-            if ch == ESC and i + 1 < len(field):
-                i += 2
+        if fmt == "sld":
+            while i < n:
+                if s[i] == REC_SEP_SLD:
+                    i += 1
+                    continue
+                fields, end = _tokenize_record(s, i, n, True)
+                yield fields
+                i = end + 1
+            return
+        while i <= n:
+            end = s.find(REC_SEP_MLD, i)
+            if end < 0:
+                end = n
+            if _NON_SPACE.search(s, i, end):
+                yield _tokenize_record(s, i, end, False)[0]
+            i = end + 1
+
+    return s, records()
+
+
+class Visitor:
+    """Callbacks for visit_sld / visit_mld / visit_file; all are no-ops.
+
+    Events follow the source order of each record: on_field for a scalar
+    (or a bare key, with value None), on_array_start / on_array_item ... /
+    on_array_end for an array. Values and type codes are decoded exactly as
+    parse_sld decodes them. A key repeated within a record is reported
+    every time it occurs (parse_sld keeps the last value), and a header
+    record is visited like any other.
+    """
+
+    def on_record_start(self, index: int) -> None:
+        pass
+
+    def on_field(self, key: str, value: Any, type_code: Optional[str]) -> None:
+        pass
+
+    def on_array_start(self, key: str, type_code: Optional[str]) -> None:
+        pass
+
+    def on_array_item(self, value: Any) -> None:
+        pass
+
+    def on_array_end(self, key: str) -> None:
+        pass
+
+    def on_record_end(self, index: int) -> None:
+        pass
+
+
+class _VisitorRecords:
+    """plain / build callables for the record loops that report to a visitor.
+
+    Each record is replayed as events from _iter_fields, with values
+    decoded by _field_value, and numbered in the order it is seen.
+    """
+
+    __slots__ = ("visitor", "count")
+
+    def __init__(self, visitor: Visitor):
+        self.visitor = visitor
+        self.count = 0
+
+    def plain(self, record: str) -> None:
+        self.build(record, None)
+
+    def build(self, s: str, fields: Optional[List[Tuple[int, int, int, int, Any]]]) -> None:
+        visitor = self.visitor
+        on_field = visitor.on_field
+        visitor.on_record_start(self.count)
+        for key, tcode, kind, raw in _iter_fields(s, fields):
+            if kind == FIELD_ARRAY:
+                visitor.on_array_start(key, tcode)
+                on_item = visitor.on_array_item
+                for a, b in raw:
+                    on_item(_parse_element_value(s[a:b], tcode))
+                visitor.on_array_end(key)
+            else:
+                on_field(key, _field_value(s, tcode, kind, raw), tcode)
+        visitor.on_record_end(self.count)
+        self.count += 1
+
+    def __call__(self, record: str) -> None:
+        if ESC not in record and ARR_OPEN not in record:
+            self.build(record, None)
+        else:
+            self.build(record, _tokenize_record(record, 0, len(record), False)[0])
+
+
+def visit_sld(text: str, visitor: Visitor) -> int:
+    """Drive visitor over the records of an SLD document.
+
+    Records are split and tokenized as parse_sld does, but each field is
+    reported straight to the visitor, so no record dicts or value lists
+    are built (the tokenizer's field spans still are). Returns the number
+    of records parse_sld would return.
+    """
+    records = _VisitorRecords(visitor)
+    text = text.replace("\r", "").replace("\n", "").rstrip(REC_SEP_SLD)
+    _parse_sld_records(text, records.plain, records.build)
+    return records.count
+
+
+def visit_mld(text: str, visitor: Visitor) -> int:
+    """Drive visitor over the records of an MLD document; see visit_sld."""
+    records = _VisitorRecords(visitor)
+    _parse_mld_records(text, records.plain, records.build)
+    return records.count
+
+
+class _RecordSplitter:
+    """Incrementally split SLD/MLD text into raw record strings.
+
+    Text is pushed with feed() in arbitrary pieces; only the unfinished tail
+    (at most one record) is kept between calls. Record boundaries follow the
+    same rules as parse_sld/parse_mld: for SLD a top-level '~' outside arrays
+    and not escaped, for MLD a newline.
+    """
+
+    _SLD_STOPS = re.compile(r"[\^~{}]")
+
+    def __init__(self, fmt: str = "sld"):
+        if fmt not in ("sld", "mld"):
+            raise ValueError(f"Unknown format: {fmt}")
+        self.fmt = fmt
+        # Scanned pieces of the unfinished record, joined once it ends, so
+        # a record fed in many pieces is copied once rather than per piece
+        self._parts: List[str] = []
+        self._depth = 0  # array depth after the scanned pieces (SLD only)
+        self._escape = False  # the last scanned character is an open '^'
+        self._tildes = 0  # trailing '~' not scanned yet (see _feed_sld)
+
+    def feed(self, data: str) -> List[str]:
+        if self.fmt == "sld":
+            return self._feed_sld(data.replace("\r", "").replace("\n", ""))
+        return self._feed_mld(data)
+
+    def close(self) -> List[str]:
+        # Held '~' are the ones parse_sld strips from the end of the document
+        rec = "".join(self._parts)
+        self._parts, self._depth, self._escape, self._tildes = [], 0, False, 0
+        if self.fmt == "sld":
+            return [rec] if rec else []
+        return [rec] if rec.strip() else []
+
+    def unfinished(self) -> Optional[str]:
+        """Error code if the input stopped now would end inside a record.
+
+        'E01' after a dangling '^', 'E02' inside an array; None otherwise
+        (always for MLD, whose records end at any newline).
+        """
+        if self.fmt != "sld":
+            return None
+        # A '^' waiting for its character is only dangling when nothing
+        # follows it; a '~' after it is escaped, even if the document-level
+        # rstrip of trailing '~' would drop it (as validate reads it).
+        if self._escape and not self._tildes:
+            return "E01"
+        if self._depth > 0:
+            return "E02"
+        return None
+
+    def _feed_sld(self, data: str) -> List[str]:
+        # parse_sld strips trailing '~' from the whole document, so a run of
+        # them at the end of the input is only scanned once more text arrives.
+        if not data.rstrip(REC_SEP_SLD):
+            self._tildes += len(data)
+            return []
+        if self._tildes:
+            data = REC_SEP_SLD * self._tildes + data
+        limit = len(data.rstrip(REC_SEP_SLD))
+        self._tildes = len(data) - limit
+        records: List[str] = []
+        parts = self._parts
+        depth = self._depth
+        start = 0
+        i = 1 if self._escape else 0
+        self._escape = False
+        search = self._SLD_STOPS.search
+        while True:
+            m = search(data, i, limit)
+            if m is None:
+                break
+            p = m.start()
+            ch = data[p]
+            if ch == ESC:
+                if p + 1 == limit:
+                    # the escaped character has not arrived yet
+                    self._escape = True
+                    break
+                i = p + 2
                 continue
-            if ch in (PROP_MARK, ARR_OPEN):
-                opener = ch
+            if ch == ARR_OPEN:
+                depth += 1
+            elif ch == ARR_CLOSE:
+                if depth > 0:
+                    depth -= 1
+            elif depth == 0:
+                if parts:
+                    parts.append(data[start:p])
+                    rec = "".join(parts)
+                    parts.clear()
+                else:
+                    rec = data[start:p]
+                if rec:
+                    records.append(rec)
+                start = p + 1
+            i = p + 1
+        if limit > start:
+            parts.append(data[start:limit])
+        self._depth = depth
+        return records
+
+    def _feed_mld(self, data: str) -> List[str]:
+        p = data.find(REC_SEP_MLD)
+        if p < 0:
+            if data:
+                self._parts.append(data)
+            return []
+        parts = self._parts
+        parts.append(data[:p])
+        first = "".join(parts)
+        parts.clear()
+        records = [first] if first.strip() else []
+        start = p + 1
+        p = data.find(REC_SEP_MLD, start)
+        while p >= 0:
+            line = data[start:p]
+            if line.strip():
+                records.append(line)
+            start = p + 1
+            p = data.find(REC_SEP_MLD, start)
+        if start < len(data):
+            parts.append(data[start:])
+        return records
+
+
+def _read_chunks(f: IO, chunk_size: int) -> Iterator[str]:
+    """Yield decoded text chunks from a text or binary file object."""
+    decoder = None
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, (bytes, bytearray)):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder("utf-8")()
+            chunk = decoder.decode(chunk)
+        yield chunk
+    if decoder is not None:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+def _iter_parse(f: IO, fmt: str, chunk_size: int, lazy: bool, fields: Optional[Iterable[str]],
+                where: Optional[Iterable[Any]]) -> Iterator[Dict[str, Any]]:
+    parse = record_parser(fields, where, lazy)
+    for rec in map(parse, iter_record_texts(f, fmt, chunk_size)):
+        if rec is not None:
+            yield rec
+
+
+def iter_parse_sld(f: IO, chunk_size: int = DEFAULT_CHUNK_SIZE, lazy: bool = False,
+                   fields: Optional[Iterable[str]] = None,
+                   where: Optional[Iterable[Any]] = None) -> Iterator[Dict[str, Any]]:
+    """Parse SLD from a file object, yielding one record at a time.
+
+    The file may be opened in text or binary (UTF-8) mode and is read in
+    chunks of chunk_size, so memory use is bounded by the largest record
+    rather than the file size. Records are identical to parse_sld output,
+    including a header record if present (see detect_header). lazy,
+    fields and where work as for parse_sld.
+    """
+    return _iter_parse(f, "sld", chunk_size, lazy, fields, where)
+
+
+def iter_parse_mld(f: IO, chunk_size: int = DEFAULT_CHUNK_SIZE, lazy: bool = False,
+                   fields: Optional[Iterable[str]] = None,
+                   where: Optional[Iterable[Any]] = None) -> Iterator[Dict[str, Any]]:
+    """Parse MLD from a file object, yielding one record per line.
+
+    Streaming counterpart of parse_mld; see iter_parse_sld.
+    """
+    return _iter_parse(f, "mld", chunk_size, lazy, fields, where)
+
+
+class SLDIncrementalDecoder:
+    """Push parser for SLD that arrives in arbitrary fragments.
+
+    feed() takes bytes (UTF-8, split anywhere, even inside a character) or
+    str and returns the records the fragment completed. Only the unfinished
+    record is kept between calls and each character is scanned once, so
+    nothing is re-buffered or re-scanned as fragments accumulate. close()
+    returns the last record, which needs no trailing '~'. Records are the
+    ones parse_sld returns for the concatenated input; lazy, fields and
+    where work as for parse_sld.
+
+    With strict (the default) close() raises ParseError when the input
+    stops inside a record: after a dangling '^' (E01) or inside an array
+    (E02). Otherwise such a tail is decoded as parse_sld would. Invalid
+    UTF-8, including input that stops inside a UTF-8 sequence, raises E08
+    in either mode.
+    """
+
+    def __init__(self, strict: bool = True, lazy: bool = False, fields: Optional[Iterable[str]] = None,
+                 where: Optional[Iterable[Any]] = None):
+        self.strict = strict
+        self.count = 0  # records split off so far, including filtered ones
+        self._parse = record_parser(fields, where, lazy)
+        self._splitter = _RecordSplitter("sld")
+        self._utf8 = codecs.getincrementaldecoder("utf-8")()
+        self._closed = False
+
+    def feed(self, data: Any) -> List[Dict[str, Any]]:
+        if self._closed:
+            raise ValueError("feed to closed decoder")
+        if not isinstance(data, str):
+            data = self._decode(data, False)
+        return self._records(self._splitter.feed(data))
+
+    def close(self) -> List[Dict[str, Any]]:
+        if self._closed:
+            return []
+        self._closed = True
+        tail = self._decode(b"", True)
+        texts = self._splitter.feed(tail) if tail else []
+        if self.strict:
+            code = self._splitter.unfinished()
+            if code is not None:
+                what = "after a dangling escape" if code == "E01" else "inside an array"
+                raise ParseError(f"input ends {what} in record {self.count + len(texts)}", None, code)
+        texts += self._splitter.close()
+        return self._records(texts)
+
+    def _decode(self, data: Any, final: bool) -> str:
+        try:
+            return self._utf8.decode(bytes(data), final)
+        except UnicodeDecodeError as e:
+            raise ParseError(f"invalid UTF-8 in record {self.count}: {e.reason}", None, "E08") from e
+
+    def _records(self, texts: List[str]) -> List[Dict[str, Any]]:
+        self.count += len(texts)
+        parse = self._parse
+        return [rec for rec in map(parse, texts) if rec is not None]
+
+
+# Records decoded between two yields to the event loop in aiter_sld/aiter_mld
+DEFAULT_ASYNC_BATCH_SIZE = 1000
+
+
+async def _aread_chunks(reader: Any, chunk_size: int) -> AsyncIterator[str]:
+    """Async counterpart of _read_chunks, for objects with an async read(n)."""
+    decoder = None
+    while True:
+        chunk = await reader.read(chunk_size)
+        if not chunk:
+            break
+        if isinstance(chunk, (bytes, bytearray)):
+            if decoder is None:
+                decoder = codecs.getincrementaldecoder("utf-8")()
+            chunk = decoder.decode(chunk)
+        yield chunk
+    if decoder is not None:
+        tail = decoder.decode(b"", final=True)
+        if tail:
+            yield tail
+
+
+async def _aiter_parse(reader: Any, fmt: str, chunk_size: int, batch_size: int, lazy: bool,
+                       fields: Optional[Iterable[str]],
+                       where: Optional[Iterable[Any]]) -> AsyncIterator[Dict[str, Any]]:
+    # imported here so that the CLIs and sync readers do not load asyncio
+    import asyncio
+
+    parse = record_parser(fields, where, lazy)
+    splitter = _RecordSplitter(fmt)
+    pending = 0
+    async for chunk in _aread_chunks(reader, chunk_size):
+        for text in splitter.feed(chunk):
+            rec = parse(text)
+            if rec is not None:
+                yield rec
+            pending += 1
+            if pending >= batch_size:
+                # reader.read() returns without suspending while data is
+                # buffered, so a fast sender could otherwise hold the loop
+                pending = 0
+                await asyncio.sleep(0)
+    for text in splitter.close():
+        rec = parse(text)
+        if rec is not None:
+            yield rec
+
+
+def aiter_sld(reader: Any, chunk_size: int = DEFAULT_CHUNK_SIZE, lazy: bool = False,
+              fields: Optional[Iterable[str]] = None, where: Optional[Iterable[Any]] = None,
+              batch_size: int = DEFAULT_ASYNC_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+    """Parse SLD from an asyncio.StreamReader, for use with async for.
+
+    reader is anything with a coroutine read(n) returning bytes (UTF-8) or
+    str. Records are split as they arrive, exactly as iter_parse_sld splits
+    them, and control returns to the event loop after every batch_size
+    records. lazy, fields and where work as for parse_sld.
+    """
+    return _aiter_parse(reader, "sld", chunk_size, batch_size, lazy, fields, where)
+
+
+def aiter_mld(reader: Any, chunk_size: int = DEFAULT_CHUNK_SIZE, lazy: bool = False,
+              fields: Optional[Iterable[str]] = None, where: Optional[Iterable[Any]] = None,
+              batch_size: int = DEFAULT_ASYNC_BATCH_SIZE) -> AsyncIterator[Dict[str, Any]]:
+    """Parse MLD from an asyncio.StreamReader, one record per line; see aiter_sld."""
+    return _aiter_parse(reader, "mld", chunk_size, batch_size, lazy, fields, where)
+
+
+# Memory-mapped files. All delimiters are ASCII, so record boundaries are
+# found on the raw UTF-8 bytes and only the records themselves are decoded.
+# An escape may be separated from its character by newlines (parse_sld drops
+# them), hence the newline run inside the escape alternative.
+_SLD_BYTE_STOPS = re.compile(rb"\^[\r\n]*[^\r\n]?|[{}~]")
+_ESCAPED_HEAD = re.compile(rb"[\r\n]*[^\r\n]?")
+
+
+def _sld_byte_records(buf: Any, end: int, start: int = 0) -> Iterator[Tuple[int, int]]:
+    """Yield (start, stop) byte spans of the SLD records in buf[start:end].
+
+    start must be 0 or the start of a record.
+    """
+    pos = start
+    depth = 0
+    while True:
+        m = _SLD_BYTE_STOPS.search(buf, pos, end)
+        if m is None:
+            break
+        p = m.start()
+        ch = buf[p]
+        if ch == 0x7B:  # '{'
+            depth += 1
+        elif ch == 0x7D:  # '}'
+            if depth > 0:
+                depth -= 1
+        elif ch == 0x7E and depth == 0:  # '~'
+            yield start, p
+            start = p + 1
+        pos = m.end()
+    if end > start:
+        yield start, end
+
+
+def _detect_format(buf: Any) -> str:
+    # CLI rule: MLD when the text has a newline and does not end with '~'
+    # (read in text mode, a lone '\r' is a newline too)
+    if buf.find(b"\n") < 0 and buf.find(b"\r") < 0:
+        return "sld"
+    end = len(buf)
+    while end > 0:
+        start = max(0, end - DEFAULT_CHUNK_SIZE)
+        while start > 0 and 0x80 <= buf[start] < 0xC0:
+            start -= 1  # back to the first byte of a UTF-8 sequence
+        tail = buf[start:end].decode("utf-8").rstrip()
+        if tail:
+            return "sld" if tail.endswith(REC_SEP_SLD) else "mld"
+        end = start
+    return "mld"
+
+
+def _sld_byte_end(buf: Any) -> int:
+    # Length of buf without the trailing '~' and newlines parse_sld strips
+    end = len(buf)
+    while end > 0 and buf[end - 1] in b"~\r\n":
+        end -= 1
+    return end
+
+
+def _mld_byte_lines(buf: Any, end: int, begin: int = 0) -> Iterator[Tuple[int, int]]:
+    """Yield (start, stop) of every line of buf[begin:end], blank ones included.
+
+    Lines end at '\n' and, as in text-mode reads, at a lone '\r'.
+    """
+    pos = begin
+    while pos < end:
+        nl = buf.find(b"\n", pos, end)
+        if nl < 0:
+            nl = end
+        start = pos
+        while start <= nl:
+            stop = buf.find(b"\r", start, nl)
+            if stop < 0:
+                stop = nl
+            yield start, stop
+            start = stop + 1
+        pos = nl + 1
+
+
+def byte_spans(buf: Any, fmt: str, begin: int = 0, end: Optional[int] = None) -> Iterator[Tuple[int, int, str]]:
+    """Yield (start, stop, text) for each record of a mapped file.
+
+    buf[start:stop] holds the record bytes; text is the decoded record as
+    parse_sld/parse_mld see it (see decode_record). Empty SLD records and
+    blank MLD lines are skipped, as those parsers do. A non-zero begin must
+    be the start of a record; scanning resumes there. With end, only
+    buf[:end] is scanned and trailing SLD separators are not stripped, for
+    ranges cut inside a document (a range may end in an escaped '~').
+    """
+    if fmt == "sld":
+        if end is None:
+            end = _sld_byte_end(buf)
+        for start, stop in _sld_byte_records(buf, end, begin):
+            rec = decode_record(buf[start:stop], fmt)
+            if rec:
+                yield start, stop, rec
+        return
+    for start, stop in _mld_byte_lines(buf, len(buf) if end is None else end, begin):
+        line = buf[start:stop].decode("utf-8")
+        if line.strip():
+            yield start, stop, line
+
+
+def decode_record(data: bytes, fmt: str) -> str:
+    """Record text from its bytes; SLD records may hold newlines parse_sld drops."""
+    rec = data.decode("utf-8")
+    if fmt == "sld" and ("\r" in rec or "\n" in rec):
+        rec = rec.replace("\r", "").replace("\n", "")
+    return rec
+
+
+@contextmanager
+def map_file(path: str) -> Iterator[Any]:
+    """Map a file read-only for the byte-level scanners.
+
+    Yields the mmap, or b"" for an empty file (which cannot be mapped); the
+    scanners and _detect_format accept either.
+    """
+    with open(path, "rb") as f:
+        if os.fstat(f.fileno()).st_size == 0:
+            yield b""
+            return
+        with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buf:
+            yield buf
+
+
+def file_format(path: str) -> str:
+    """The validator CLI's format detection, on the mapped file."""
+    with map_file(path) as buf:
+        return _detect_format(buf)
+
+
+def iter_record_texts(source: Union[str, IO], fmt: Optional[str] = None,
+                      chunk_size: int = DEFAULT_CHUNK_SIZE) -> Iterator[str]:
+    """Yield the raw records of a file path or an open file object.
+
+    Records are split as parse_sld/parse_mld split them, ready for
+    parse_record or record_parser. A path is mapped (see iter_parse_file)
+    and fmt defaults to the CLI's detection; a file object is read in
+    chunk_size pieces (see iter_parse_sld) and fmt is required.
+    """
+    if isinstance(source, str):
+        with map_file(source) as buf:
+            for _, _, text in byte_spans(buf, fmt or _detect_format(buf)):
+                yield text
+        return
+    if fmt is None:
+        raise ValueError("fmt is required when reading a file object")
+    splitter = _RecordSplitter(fmt)
+    for chunk in _read_chunks(source, chunk_size):
+        yield from splitter.feed(chunk)
+    yield from splitter.close()
+
+
+def iter_parse_file(path: str, fmt: Optional[str] = None, lazy: bool = False,
+                    fields: Optional[Iterable[str]] = None,
+                    where: Optional[Iterable[Any]] = None) -> Iterator[Dict[str, Any]]:
+    """Parse an SLD/MLD file through mmap, yielding one record at a time.
+
+    Boundaries are found on the mapped bytes and each record is decoded to
+    str only when it is emitted, so the file is never read or decoded as a
+    whole and the OS page cache does the I/O. fmt defaults to the CLI's
+    detection. Records equal parse_sld/parse_mld on the file read in text
+    mode; lazy, fields and where work as for parse_sld.
+    """
+    parse = record_parser(fields, where, lazy)
+    for text in iter_record_texts(path, fmt):
+        rec = parse(text)
+        if rec is not None:
+            yield rec
+
+
+def parse_file(path: str, fmt: Optional[str] = None, lazy: bool = False,
+               fields: Optional[Iterable[str]] = None,
+               where: Optional[Iterable[Any]] = None) -> List[Dict[str, Any]]:
+    """Parse a whole SLD/MLD file through mmap; see iter_parse_file."""
+    return list(iter_parse_file(path, fmt, lazy, fields, where))
+
+
+def visit_file(path: str, visitor: Visitor, fmt: Optional[str] = None) -> int:
+    """Drive visitor over the records of a file through mmap.
+
+    Records are found as iter_parse_file finds them and reported as
+    visit_sld reports them; returns the number of records.
+    """
+    records = _VisitorRecords(visitor)
+    for text in iter_record_texts(path, fmt):
+        records(text)
+    return records.count
+
+
+# Syntax-only checking. Records are split as the parsers split them, then
+# scanned once for the errors of the spec's table (E01-E10); no values are
+# decoded and nothing is built. Not checked: E07 (no limits are imposed) and
+# E10 (no directives are defined).
+_CHECK_STOPS = re.compile(r"[\^;\[{}]")
+_CHECK_ARRAY_STOPS = re.compile(r"[\^{}]")
+_HEADER_VERSION = re.compile(r"[0-9]+(?:\.[0-9]+)*")
+FEATURE_TOKENS = frozenset({"types", "null", "canon"})
+
+
+def _check_scalar(raw: str, tcode: Optional[str]) -> Optional[Tuple[str, str]]:
+    # (code, message) for a scalar value the spec rejects
+    if raw.endswith("]") and not raw.endswith("^]"):
+        raw = raw[:-1]
+    if tcode == "b":
+        if raw not in ("0", "1", "^0", "^1"):
+            return "E04", f"invalid boolean {raw!r}"
+        return None
+    if tcode == "n":
+        if raw not in ("", "^_"):
+            return "E05", f"typed null with a value {raw!r}"
+        return None
+    j = raw.find(ESC)
+    while j >= 0:
+        code = raw[j + 1:j + 2]
+        if code == "_" and raw != "^_":
+            return "E05", "'^_' must be the whole value"
+        if code in ("0", "1") and len(raw) != 2:
+            return "E04", f"'^{code}' must be the whole value"
+        j = raw.find(ESC, j + 2)
+    return None
+
+
+def _check_record(s: str) -> Tuple[Optional[Tuple[str, int, str]], int, int]:
+    """Syntax-check one record, as byte_spans yields it.
+
+    Returns (error, keys, reserved): error is (code, index into s, message)
+    or None, keys counts the fields and reserved those whose key starts
+    with '!'.
+    """
+    n = len(s)
+    keys = reserved = 0
+    i = 0
+    while i < n:
+        start = i
+        while True:
+            m = _CHECK_STOPS.search(s, i)
+            if m is None:
+                p, ch = n, ""
                 break
-            i += 1
-        if opener is None:
-            # key with empty value
-            key_raw = field
-            key, tcode = _parse_key_and_type(key_raw)
-            out[key] = None
+            p = m.start()
+            ch = s[p]
+            if ch != ESC:
+                break
+            if p + 1 >= n:
+                return ("E01", p, "dangling escape at end of record"), keys, reserved
+            i = p + 2
+        if ch == FIELD_SEP or not ch:
+            if p > start:
+                return ("E03", p, f"field {s[start:p]!r} ends without '[' or '{{'"), keys, reserved
+            i = p + 1
             continue
-        head = field[:i]
-        key, tcode = _parse_key_and_type(head)
-
-        if opener == PROP_MARK:
-            # scalar value up to field or record end (handled by parent split)
-            value_text = field[i + 1 :]
-            # Trim accidental trailing ']' (not a grammar token)
-            if value_text.endswith(']') and not value_text.endswith('^]'):
-                value_text = value_text[:-1]
-            if tcode:
-                # typed scalar
-                if tcode == "n":
-                    # Type code 'n' no longer used for null in v2.0 (use ^_ instead)
-                    # Preserve for backward compatibility
-                    out[key] = None
+        if ch not in (PROP_MARK, ARR_OPEN):
+            return ("E01", p, f"unescaped {ch!r} in key"), keys, reserved
+        keys += 1
+        if s.startswith("!", start):
+            reserved += 1
+        excl = s.rfind("!", start + 1, p)
+        tcode = None
+        if excl > start:
+            tcode = s[excl + 1:p]
+            if tcode not in TYPE_CODES:
+                return ("E06", excl, f"unknown type code {tcode!r}"), keys, reserved
+        if ch == PROP_MARK:
+            j = p + 1
+            while True:
+                m = _CHECK_STOPS.search(s, j)
+                if m is None:
+                    end = n
+                    break
+                q = m.start()
+                c = s[q]
+                if c == FIELD_SEP:
+                    end = q
+                    break
+                if c != ESC:
+                    return ("E01", q, f"unescaped {c!r} in value"), keys, reserved
+                if q + 1 >= n:
+                    return ("E01", q, "dangling escape at end of record"), keys, reserved
+                j = q + 2
+            if tcode in ("b", "n") or ESC in s[p + 1:end]:
+                err = _check_scalar(s[p + 1:end], tcode)
+                if err is not None:
+                    return (err[0], p + 1, err[1]), keys, reserved
+            i = end + 1
+            continue
+        depth = 1
+        j = p + 1
+        while depth:
+            m = _CHECK_ARRAY_STOPS.search(s, j)
+            if m is None:
+                return ("E02", p, "array is not closed"), keys, reserved
+            q = m.start()
+            c = s[q]
+            j = q + 1
+            if c == ESC:
+                if q + 1 >= n:
+                    return ("E01", q, "dangling escape at end of record"), keys, reserved
+                j = q + 2
+            elif c == ARR_OPEN:
+                depth += 1
+            else:
+                depth -= 1
+        if j < n and s[j] != FIELD_SEP:
+            return ("E03", j, "text after the end of an array"), keys, reserved
+        i = j + 1
+    return None, keys, reserved
+
+
+def _check_header(rec: Dict[str, Any]) -> Optional[str]:
+    # Message for malformed header metadata (E09)
+    version = rec.get("!v")
+    if "!v" in rec and not (isinstance(version, str) and _HEADER_VERSION.fullmatch(version)):
+        return f"invalid version {version!r}"
+    features = rec.get("!features")
+    if "!features" in rec:
+        if not isinstance(features, list):
+            return "!features must be an array"
+        unknown = [f for f in features if f not in FEATURE_TOKENS]
+        if unknown:
+            return f"unknown feature {unknown[0]!r}"
+    return None
+
+
+def _byte_offset(data: bytes, fmt: str, index: int) -> int:
+    # Offset in data of character index of the record text (see decode_record)
+    raw = data.decode("utf-8")
+    if fmt == "sld" and ("\r" in raw or "\n" in raw):
+        seen = 0
+        for k, ch in enumerate(raw):
+            if ch in "\r\n":
+                continue
+            if seen == index:
+                return len(raw[:k].encode("utf-8"))
+            seen += 1
+        return len(data)
+    return len(raw[:index].encode("utf-8"))
+
+
+def _stream_record_bytes(f: IO, fmt: str, chunk_size: int) -> Iterator[Tuple[int, bytes]]:
+    """Yield (offset, data) for the records of a binary stream.
+
+    Records are split as byte_spans splits a mapped file, empty ones
+    included and without dropping a final '~' that is escaped. Each read
+    is scanned once: the pieces of the unfinished record are kept in a
+    list, with the array depth and a pending '^', and joined when it ends.
+    """
+    parts: List[bytes] = []
+    base = 0  # offset of the current read
+    if fmt != "sld":
+        while True:
+            chunk = f.read(chunk_size)
+            if not chunk:
+                break
+            nl = chunk.rfind(b"\n")
+            if nl < 0:
+                parts.append(chunk)
+                continue
+            parts.append(chunk[:nl + 1])
+            data = b"".join(parts)
+            parts = [chunk[nl + 1:]]
+            for start, stop in _mld_byte_lines(data, len(data)):
+                yield base + start, data[start:stop]
+            base += len(data)
+        data = b"".join(parts)
+        for start, stop in _mld_byte_lines(data, len(data)):
+            yield base + start, data[start:stop]
+        return
+    rec_start = 0  # offset of the unfinished record
+    depth = 0
+    escape = False  # a '^' still waits for its character
+    while True:
+        chunk = f.read(chunk_size)
+        if not chunk:
+            break
+        n = len(chunk)
+        start = pos = 0
+        if escape:
+            # newlines between '^' and its character are skipped, as in
+            # _SLD_BYTE_STOPS
+            head = _ESCAPED_HEAD.match(chunk)
+            pos = head.end()
+            escape = not head.group().rstrip(b"\r\n")
+        while not escape:
+            m = _SLD_BYTE_STOPS.search(chunk, pos)
+            if m is None:
+                break
+            p = m.start()
+            ch = chunk[p]
+            pos = m.end()
+            if ch == 0x5E:  # '^'
+                # no character after the '^' (and its newlines) yet
+                escape = m.group().rstrip(b"\r\n") == b"^"
+            elif ch == 0x7B:  # '{'
+                depth += 1
+            elif ch == 0x7D:  # '}'
+                if depth > 0:
+                    depth -= 1
+            elif depth == 0:  # '~'
+                if parts:
+                    parts.append(chunk[start:p])
+                    rec = b"".join(parts)
+                    parts = []
                 else:
-                    out[key] = _convert_typed(value_text, tcode)
+                    rec = chunk[start:p]
+                yield rec_start, rec
+                start = p + 1
+                rec_start = base + start
+        if start < n:
+            parts.append(chunk[start:])
+        base += n
+    if parts:
+        yield rec_start, b"".join(parts)
+
+
+def _check_records(chunks: Iterable[Tuple[int, Any]], fmt: str) -> int:
+    index = 0
+    for offset, data in chunks:
+        try:
+            text = decode_record(data, fmt)
+        except UnicodeDecodeError as e:
+            raise ParseError(f"invalid UTF-8: {e.reason}", offset + e.start, "E08", index) from None
+        if not (text.strip() if fmt == "mld" else text):
+            continue
+        err, keys, reserved = _check_record(text)
+        if err is None and reserved:
+            if index:
+                err = ("E09", 0, "'!' keys are reserved for the header record")
+            elif reserved != keys:
+                err = ("E09", 0, "header record mixes '!' keys with data keys")
             else:
-                v, is_bool, is_null = _unescape(value_text)
-                if is_null:
-                    out[key] = None
-                elif is_bool:
-                    out[key] = v
+                msg = _check_header(parse_record(text))
+                if msg is not None:
+                    err = ("E09", 0, msg)
+        if err is not None:
+            code, pos, msg = err
+            raise ParseError(msg, offset + _byte_offset(data, fmt, pos), code, index)
+        index += 1
+    return index
+
+
+def validate(source: Any, fmt: Optional[str] = None, chunk_size: int = DEFAULT_CHUNK_SIZE) -> int:
+    """Check that an SLD/MLD file is well-formed, without decoding it.
+
+    source is a path (read through mmap; fmt defaults to the CLI's
+    detection) or a binary file object (read in chunks of chunk_size; fmt
+    is required). Memory use does not depend on the input size. Returns the
+    number of records parse_sld/parse_mld would return. On the first error
+    raises ParseError with the spec's code, the byte offset of the error
+    (pos) and the index of the record holding it (record).
+    """
+    if not isinstance(source, str):
+        if fmt is None:
+            raise ValueError("fmt is required when reading a file object")
+        return _check_records(_stream_record_bytes(source, fmt, chunk_size), fmt)
+    with map_file(source) as buf:
+        fmt = fmt or _detect_format(buf)
+        if fmt == "sld":
+            spans: Iterable[Tuple[int, int]] = _sld_byte_records(buf, len(buf))
+        else:
+            spans = _mld_byte_lines(buf, len(buf))
+        return _check_records(((start, buf[start:stop]) for start, stop in spans), fmt)
+
+
+class Column:
+    """A decoded column of values, one slot per record.
+
+    values is an array.array('q') for '!i' columns, array.array('d') for
+    '!f' columns, or a plain list otherwise. Typed columns keep nulls (and
+    records without the key) in the valid bitmap instead of the values:
+    bit i (LSB first) of valid is set when slot i holds a value. valid is
+    None when every slot is present. List columns hold None for nulls.
+    """
+
+    __slots__ = ("values", "valid")
+
+    def __init__(self, values: Any, valid: Optional[bytearray] = None):
+        self.values = values
+        self.valid = valid
+
+    def __len__(self) -> int:
+        return len(self.values)
+
+    def is_valid(self, i: int) -> bool:
+        if self.valid is None:
+            return self.values[i] is not None if isinstance(self.values, list) else True
+        return bool(self.valid[i >> 3] & (1 << (i & 7)))
+
+    def __getitem__(self, i: int) -> Any:
+        if self.valid is not None and not self.is_valid(i):
+            return None
+        return self.values[i]
+
+    def to_list(self) -> List[Any]:
+        if self.valid is None:
+            return list(self.values)
+        return [self[i] for i in range(len(self.values))]
+
+    def __repr__(self) -> str:
+        return f"Column({self.to_list()!r})"
+
+
+# Columns whose values are native machine numbers
+_COLUMN_TYPECODES = {"i": "q", "f": "d"}
+_COLUMN_PY_TYPES = {"q": int, "d": float}
+
+
+class _ColumnBuilder:
+    __slots__ = ("typecode", "values", "valid", "rows")
+
+    def __init__(self, typecode: Optional[str]):
+        self.typecode = typecode
+        self.values: Any = array(typecode) if typecode else []
+        self.valid: Optional[bytearray] = None
+        self.rows = 0
+
+    def set(self, row: int, value: Any) -> None:
+        if self.rows > row:
+            # repeated key within one record: the last value wins
+            self._pop()
+        while self.rows < row:
+            self._append(None)
+        self._append(value)
+
+    def finish(self, rows: int) -> Column:
+        while self.rows < rows:
+            self._append(None)
+        return Column(self.values, self.valid)
+
+    def _append(self, value: Any) -> None:
+        if self.typecode is not None:
+            if value is None:
+                self._mark_null()
+                self.values.append(0)
+                self.rows += 1
+                return
+            if type(value) is _COLUMN_PY_TYPES[self.typecode]:
+                try:
+                    self.values.append(value)
+                except OverflowError:
+                    self._demote()
                 else:
-                    out[key] = v
+                    if self.valid is not None:
+                        self._mark_valid()
+                    self.rows += 1
+                    return
+            else:
+                # conversion fell back to another type: keep exact values
+                self._demote()
+        self.values.append(value)
+        self.rows += 1
+
+    def _mark_null(self) -> None:
+        if self.valid is None:
+            # first null: every earlier slot was present
+            self.valid = bytearray(b"\xff" * (self.rows >> 3))
+            if self.rows & 7:
+                self.valid.append((1 << (self.rows & 7)) - 1)
+        if not self.rows & 7:
+            self.valid.append(0)
+
+    def _mark_valid(self) -> None:
+        if not self.rows & 7:
+            self.valid.append(1)
         else:
-            # array container; element type from tcode if present
-            arr_items, _ = _parse_array(field, i, tcode)
-            out[key] = arr_items
-    return out
+            self.valid[-1] |= 1 << (self.rows & 7)
 
+    def _pop(self) -> None:
+        self.rows -= 1
+        self.values.pop()
+        if self.valid is not None:
+            if not self.rows & 7:
+                self.valid.pop()
+            else:
+                self.valid[-1] &= ~(1 << (self.rows & 7))
 
-def parse_sld(text: str) -> List[Dict[str, Any]]:
-    # Normalize accidental newlines (e.g., CRLF in files saved on Windows)
-    text = text.replace("\r", "")
-    text = text.replace("\n", "")
-    text = text.rstrip(REC_SEP_SLD)
-    if not text:
-        return []
-    recs = _split_records_sld(text)
-    return [_parse_record(r) for r in recs]
+    def _demote(self) -> None:
+        self.values = Column(self.values, self.valid).to_list()
+        self.typecode = None
+        self.valid = None
 
 
-def parse_mld(text: str) -> List[Dict[str, Any]]:
-    lines = [ln for ln in text.split(REC_SEP_MLD) if ln.strip()]
-    return [_parse_record(ln) for ln in lines]
+def parse_columns(text: str, fmt: str = "sld") -> Tuple[Optional[Dict[str, Any]], Dict[str, Column]]:
+    """Decode SLD/MLD straight into columns, without per-record dicts.
+
+    Returns (header, columns) where columns maps each key, in order of first
+    appearance, to a Column with one slot per body record; records that lack
+    the key hold a null. A key whose first value carries an inline '!i' or
+    '!f' type gets a native array column; if a later value in it is not an
+    int/float (untyped text, failed conversion, out of int64 range) the
+    column falls back to a list holding the exact values parse_sld/parse_mld
+    would return.
+    """
+    s, records = tokenize_records(text, fmt)
+    header: Optional[Dict[str, Any]] = None
+    builders: Dict[str, _ColumnBuilder] = {}
+    row = 0
+    for fields in records:
+        if row == 0 and header is None:
+            items = [field_item(s, f) for f in fields]
+            if all(key.startswith("!") for key, _, _ in items):
+                header = {key: value for key, _, value in items}
+                continue
+        else:
+            items = (field_item(s, f) for f in fields)
+        for key, tcode, value in items:
+            builder = builders.get(key)
+            if builder is None:
+                builder = builders[key] = _ColumnBuilder(_COLUMN_TYPECODES.get(tcode))
+            builder.set(row, value)
+        row += 1
+    return header, {key: b.finish(row) for key, b in builders.items()}
 
 
 def detect_header(records: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], List[Dict[str, Any]]]:
@@ -384,6 +1827,17 @@ def detect_header(records: List[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any
     return None, records
 
 
+def iter_detect_header(records: Iterable[Dict[str, Any]]) -> Tuple[Optional[Dict[str, Any]], Iterator[Dict[str, Any]]]:
+    """detect_header for a stream of records; only the first one is read."""
+    records = iter(records)
+    first = next(records, None)
+    if first is None:
+        return None, records
+    if all(k.startswith("!") for k in first.keys()):
+        return first, records
+    return None, chain([first], records)
+
+
 def to_canonical(obj: Any) -> Any:
     if isinstance(obj, dict):
         # sort keys; NFC normalize strings recursively
@@ -395,6 +1849,34 @@ def to_canonical(obj: Any) -> Any:
     return obj
 
 
+def write_json(out: IO, header: Optional[Dict[str, Any]], records: Iterable[Dict[str, Any]],
+               lines: bool = False, canon: bool = False) -> int:
+    """Write records as JSON to a text stream, one record at a time.
+
+    The default is the CLI's {"header": ..., "records": [...]} document,
+    compact with one record per line; with lines=True, JSON Lines with the
+    header, if any, on the first line. records is consumed lazily, so a
+    streaming reader keeps memory flat. Returns the number of records.
+    """
+    def dump(obj: Any) -> str:
+        return json.dumps(to_canonical(obj) if canon else obj, ensure_ascii=False)
+
+    count = 0
+    if lines:
+        if header is not None:
+            out.write(dump(header) + "\n")
+        for rec in records:
+            out.write(dump(rec) + "\n")
+            count += 1
+        return count
+    out.write('{"header": ' + dump(header) + ', "records": [')
+    for rec in records:
+        out.write(("\n" if count == 0 else ",\n") + dump(rec))
+        count += 1
+    out.write("\n]}\n" if count else "]}\n")
+    return count
+
+
 def main(argv: List[str]) -> int:
     import argparse
 
@@ -402,33 +1884,39 @@ def main(argv: List[str]) -> int:
     p.add_argument("file", nargs="?", help="Input file (.sld or .mld). If omitted, reads stdin")
     p.add_argument("--canon", action="store_true", help="Emit canonicalized JSON (sorted keys, NFC strings)")
     p.add_argument("--format", choices=["sld", "mld"], help="Force input format detection")
+    p.add_argument("--jsonl", action="store_true",
+                   help="Emit JSON Lines: the header, if any, then one record per line")
+    p.add_argument("--check", action="store_true",
+                   help="Only check the syntax, in constant memory (--format is required for stdin)")
     args = p.parse_args(argv)
-
-    if args.file:
-        with open(args.file, "r", encoding="utf-8") as f:
-            data = f.read()
-    else:
-        data = sys.stdin.read()
-
-    fmt = args.format
-    if fmt is None:
-        # naive detect: if contains '\n' treat as MLD
-        fmt = "mld" if "\n" in data and not data.strip().endswith(REC_SEP_SLD) else "sld"
+    if args.check and args.file is None and args.format is None:
+        p.error("--check needs --format when reading stdin")
 
     try:
-        records = parse_mld(data) if fmt == "mld" else parse_sld(data)
-        header, body = detect_header(records)
-        out = {"header": header, "records": body}
-        if args.canon:
-            out = to_canonical(out)
+        if args.check:
+            count = validate(args.file or sys.stdin.buffer, args.format)
+            sys.stdout.write(f"OK: {count} records\n")
+            return 0
+        if args.file:
+            # mapped and decoded record by record; same format detection
+            records: Iterable[Dict[str, Any]] = iter_parse_file(args.file, args.format)
+        elif args.format is not None:
+            records = (iter_parse_mld if args.format == "mld" else iter_parse_sld)(sys.stdin.buffer)
+        else:
+            data = sys.stdin.read()
+            # naive detect: if contains '\n' treat as MLD
+            fmt = "mld" if "\n" in data and not data.strip().endswith(REC_SEP_SLD) else "sld"
+            records = parse_mld(data) if fmt == "mld" else parse_sld(data)
+        header, body = iter_detect_header(records)
         # Ensure UTF-8 output on Windows
         import io
         sys.stdout = io.TextIOWrapper(sys.stdout.buffer, encoding='utf-8')
-        json.dump(out, sys.stdout, ensure_ascii=False, indent=2)
-        sys.stdout.write("\n")
+        write_json(sys.stdout, header, body, args.jsonl, args.canon)
+        sys.stdout.flush()
         return 0
     except ParseError as e:
-        sys.stderr.write(f"Parse error {e.code}: {e} at {e.pos}\n")
+        where = f"at {e.pos}" if e.record is None else f"at byte {e.pos} (record {e.record})"
+        sys.stderr.write(f"Parse error {e.code}: {e} {where}\n")
         return 2
 
 